@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FrontlineBackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'frontline_backend'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .caching import acached_reference
+from .conditional import aconditional_response, ascope_validators
+from .models import Client, ProgramClient, Program, WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, ClienAttendanceUpdates, Leads, LeadsFollowup
+from .pagination import list_response
+from .serializers import ClientSerializer, ProgramsSerializer, WeeklyWorkoutSerializer, ProgramClientDaysSerializer, LeadsSerializer
+from .weekdays import masks_with_day
+
+# Async counterparts of the busiest read endpoints, routed instead of the APIViews when
+# ASYNC_READ_VIEWS is set (deployments serving frontline_fitness.asgi). Responses match the sync views.
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def attach(parents, children, parent_attr, accessor):
+    # Give each parent the children a separate query fetched, the way prefetch_related fills
+    # `parent.<accessor>.all()`, so serializers read them without another query
+    grouped = defaultdict(list)
+    for child in children:
+        grouped[getattr(child, parent_attr)].append(child)
+    for parent in parents:
+        parent._prefetched_objects_cache = {accessor: grouped.get(parent.pk, [])}
+    return parents
+
+
+class AsyncAPIView(View):
+    """
+    Async read view: authenticates with the DRF authentication classes, renders with DRF's
+    JSONRenderer and hands ?cursor=/?page_size= requests to the sync keyset pagination.
+    """
+    login_required = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            # StatelessJWTAuthentication needs no query, "Token" keys are looked up in a thread
+            request.user = await sync_to_async(lambda: self.drf_request.user)()
+        except APIException as exc:
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+        if self.login_required and not request.user.is_authenticated:
+            return json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def paginated(self, request):
+        return 'cursor' in request.GET or 'page_size' in request.GET
+
+    async def paginated_response(self, queryset, serializer_class):
+        response = await sync_to_async(list_response)(self.drf_request, queryset, serializer_class)
+        return json_response(response.data, status=response.status_code)
+
+
+class AsyncClientListByDateView(AsyncAPIView):
+    async def get(self, request, attendance_date):
+        try:
+            selected_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
+        except ValueError:
+            return json_response({'error': 'Invalid date format'}, status=400)
+
+        attendance_subquery = ClienAttendanceUpdates.objects.filter(
+            client=OuterRef('client'), workout_date=selected_date, trainer_id=request.user.id
+        )
+        program_clients = ProgramClient.objects.filter(
+            status='active',
+            client__workout_start_date__lte=selected_date,
+            workout_days_mask__in=masks_with_day(selected_date),
+            trainer_id=request.user.id,
+        ).annotate(
+            has_attendance=Exists(attendance_subquery)
+        ).select_related('client', 'program', 'trainer', 'dietitian')
+        return json_response(ProgramClientDaysSerializer([row async for row in program_clients], many=True).data)
+
+
+class AsyncClientListView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user.id
+        client_scope = Client.objects.filter(new_client=False, programs__trainer_id=user)
+        clients = client_scope.distinct()
+        programs = ProgramClient.objects.filter(client__in=client_scope).select_related('program')
+
+        async def build_response():
+            if self.paginated(request):
+                return await self.paginated_response(clients.prefetch_related('programs__program'), ClientSerializer)
+            # The async ORM runs every query on the one shared DB thread, so these are awaited in turn
+            client_rows = await _fetch(clients)
+            program_rows = await _fetch(programs)
+            attach(client_rows, program_rows, 'client_id', 'programs')
+            return json_response(ClientSerializer(client_rows, many=True).data)
+
+        return await aconditional_response(
+            request,
+            await ascope_validators(request, programs, 'updated_at', 'client__updated_at', 'program__updated_at'),
+            build_response,
+        )
+
+
+class AsyncProgramListView(AsyncAPIView):
+    login_required = False
+
+    async def get(self, request):
+        programs = Program.objects.all()
+
+        async def build_response():
+            if self.paginated(request):
+                return await self.paginated_response(programs, ProgramsSerializer)
+            data = await acached_reference('programs', 'list', lambda: _serialize(programs, ProgramsSerializer))
+            return json_response(data)
+
+        return await aconditional_response(request, await ascope_validators(request, programs, 'updated_at'), build_response)
+
+
+class AsyncLeadsListView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user.id
+        leads = Leads.objects.filter(sales_id=user).select_related('country')
+        if self.paginated(request):
+            return await self.paginated_response(leads.prefetch_related('leadsfollowup_set'), LeadsSerializer)
+
+        lead_rows = await _fetch(leads)
+        followup_rows = await _fetch(LeadsFollowup.objects.filter(lead__sales_id=user))
+        attach(lead_rows, followup_rows, 'lead_id', 'leadsfollowup_set')
+        return json_response(LeadsSerializer(lead_rows, many=True).data)
+
+
+class AsyncWeeklyWorkoutDetailsView(AsyncAPIView):
+    login_required = False
+
+    async def get(self, request, client_id):
+        weekly_updates = WeeklyWorkoutUpdates.objects.filter(client_id=client_id).order_by('-week_no')
+
+        async def build_response():
+            if not await Client.objects.filter(id=client_id).aexists():
+                return json_response({'error': 'Client not found'}, status=404)
+            week_rows = await _fetch(weekly_updates)
+            day_rows = await _fetch(WeeklyWorkoutwithDaysUpdates.objects.filter(weekly_updates_id__client_id=client_id))
+            attach(week_rows, day_rows, 'weekly_updates_id_id', 'daily_workouts')
+            return json_response(WeeklyWorkoutSerializer(week_rows, many=True).data)
+
+        return await aconditional_response(
+            request,
+            await ascope_validators(request, weekly_updates, 'updated_at', 'daily_workouts__updated_at', count_fields=('id', 'daily_workouts__id')),
+            build_response,
+        )
+
+
+async def _fetch(queryset):
+    return [row async for row in queryset]
+
+
+async def _serialize(queryset, serializer_class):
+    return list(serializer_class(await _fetch(queryset), many=True).data)
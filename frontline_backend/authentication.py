@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User, UserRole, TokenUser
+
+# How long a user's active flag and roles are trusted before StatelessJWTAuthentication re-reads them.
+# signals.forget_auth_state drops the entry on changes, other processes catch up within this time.
+AUTH_STATE_TIMEOUT = getattr(settings, 'AUTH_STATE_TIMEOUT', 60)
+
+# User fields carried in the token, as (claim, model field)
+IDENTITY_CLAIMS = [
+    ('email', 'email'),
+    ('name', 'name'),
+    ('staff_id', 'user_id'),
+    ('is_staff', 'is_staff'),
+    ('is_superuser', 'is_superuser'),
+]
+
+
+def add_identity_claims(token, user, roles):
+    for claim, field in IDENTITY_CLAIMS:
+        token[claim] = getattr(user, field)
+    token['roles'] = [{'id': user_role.role.id, 'rolename': user_role.role.rolename} for user_role in roles]
+    return token
+
+
+def auth_state_key(user_pk):
+    return f'auth:state:{user_pk}'
+
+
+def auth_state(user_pk):
+    # (is_active, sorted [(role id, rolename)]) as currently stored, a deleted user counts as inactive
+    state = cache.get(auth_state_key(user_pk))
+    if state is None:
+        is_active = User.objects.filter(pk=user_pk).values_list('is_active', flat=True).first()
+        roles = sorted(UserRole.objects.filter(user_id=user_pk).values_list('role_id', 'role__rolename')) if is_active else []
+        state = (bool(is_active), roles)
+        cache.set(auth_state_key(user_pk), state, AUTH_STATE_TIMEOUT)
+    return state
+
+
+def stored_user(user):
+    # The User row behind request.user, for code that writes to it. A TokenUser only holds claims.
+    if isinstance(user, TokenUser):
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    # Builds request.user from the signed claims instead of loading it. Only the user's active flag and
+    # roles are checked, against a short-lived cache, so deactivations and role changes apply right away.
+    # Fields not in the token are deferred and only load if a view reads them.
+    def get_user(self, validated_token):
+        try:
+            user_pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        if 'roles' not in validated_token:
+            # Issued by the stock token views, without our claims
+            return super().get_user(validated_token)
+
+        is_active, roles = auth_state(user_pk)
+        if not is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if roles != sorted((role['id'], role['rolename']) for role in validated_token['roles']):
+            # RoleTokenRefreshView re-reads the roles
+            raise InvalidToken('The roles in this token have changed, refresh it')
+
+        loaded = {'id': user_pk, 'is_active': True}
+        for claim, field in IDENTITY_CLAIMS:
+            loaded[field] = validated_token.get(claim)
+        # from_db() expects the values in model field order
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        user = TokenUser.from_db('default', field_names, [loaded[name] for name in field_names])
+        user.token_roles = validated_token['roles']
+        return user
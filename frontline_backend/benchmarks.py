@@ -0,0 +1,328 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import (
+    User, Role, UserRole, TrainerAvailability, Program, Client, ProgramClient, TrainerSlot, ConsulationSchedules,
+    WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, ClienAttendanceUpdates, Country, Leads, LeadsFollowup,
+)
+from .rollups import rebuild_rollups
+from .schedules import build_week
+from .urls import urlpatterns
+from .weekdays import WEEKDAYS, weekday_mask
+
+SEED_BATCH_SIZE = 5000
+BENCHMARK_PASSWORD = 'benchmark'
+DEFAULT_COUNTS = {'trainers': 50, 'clients': 20000, 'attendance': 2000000, 'leads': 200000}
+# Routes the SQLite benchmark database cannot serve, reported as skipped instead of timed
+SQLITE_UNSUPPORTED = {
+    'program-list-type': 'filters Program.program_type with JSONField __contains, which SQLite lacks',
+}
+WORKOUT_PATTERNS = [
+    ['Monday', 'Wednesday', 'Friday'], ['Tuesday', 'Thursday', 'Saturday'],
+    ['Monday', 'Tuesday', 'Thursday', 'Friday'], ['Wednesday', 'Saturday'],
+]
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def insert_rows(model, fields, rows):
+    # executemany straight into the table: at millions of rows Model() and bulk_create's per-value
+    # preparation cost far more than SQLite does, so rows arrive already in database format
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+    sql = f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    total = 0
+    with connection.cursor() as cursor:
+        for chunk in batched(rows, SEED_BATCH_SIZE):
+            cursor.executemany(sql, chunk)
+            total += len(chunk)
+    return total
+
+
+def seed(counts, log=print):
+    """
+    Fill an empty database with trainers, clients on weekly plans with attendance history,
+    and leads with follow-ups. Deterministic for the same counts.
+    """
+    rng = random.Random(0)
+    today = timezone.localdate()
+    now = str(timezone.now().replace(tzinfo=None))
+    password = make_password(BENCHMARK_PASSWORD)
+    days_per_client = max(1, counts['attendance'] // max(counts['clients'], 1))
+    # Far enough back that the sparsest pattern (two days a week) has days_per_client past workouts
+    first_week = today - timedelta(days=today.weekday()) - timedelta(weeks=days_per_client // 2 + 2)
+
+    with transaction.atomic():
+        roles = {name: Role.objects.create(rolename=name) for name in ('admin', 'manager', 'trainer', 'dietitian', 'sales')}
+        staff = {'admin': 1, 'manager': 2, 'trainer': counts['trainers'], 'dietitian': max(1, counts['trainers'] // 5),
+                 'sales': max(1, counts['leads'] // 10000)}
+        users = []
+        for rolename, number in staff.items():
+            for index in range(number):
+                users.append(User(
+                    email=f'{rolename}{index}@benchmark.local', name=f'{rolename.title()} {index}', phone='9000000000',
+                    country='IN', password=password, status='active', is_staff=rolename == 'admin',
+                    available_days=WEEKDAYS[:6], available_time=[['06:00', '12:00'], ['16:00', '21:00']],
+                ))
+        User.objects.bulk_create(users)
+        by_role = {rolename: list(User.objects.filter(email__startswith=rolename).order_by('id')) for rolename in staff}
+        UserRole.objects.bulk_create([
+            UserRole(user=user, role=roles[rolename]) for rolename, members in by_role.items() for user in members
+        ])
+        for trainer in by_role['trainer']:
+            TrainerAvailability.refresh_for(trainer)
+        trainers, sales = by_role['trainer'], by_role['sales']
+        log(f"Seeded {len(users)} staff")
+
+        countries = Country.objects.bulk_create([
+            Country(country_code=code, country_name=name)
+            for code, name in [('IN', 'India'), ('AE', 'UAE'), ('GB', 'United Kingdom'), ('US', 'United States'), ('SG', 'Singapore')]
+        ])
+        programs = Program.objects.bulk_create([
+            Program(name=f'Program {index}', program_type=['personal'] if index % 2 else ['group'], status='active')
+            for index in range(10)
+        ])
+
+        insert_rows(Client, ['client_id', 'name', 'source', 'email', 'phone', 'status', 'new_client', 'workout_start_date',
+                             'diet_first_consultation', 'trainer_first_consultation', 'updated_at'], (
+            (f'FFC{index:06d}', f'Client {index}', 'ad', f'client{index}@benchmark.local', '9000000000', 'converted',
+             False, str(first_week), 1, 1, now)
+            for index in range(counts['clients'])
+        ))
+        client_ids = list(Client.objects.order_by('id').values_list('id', flat=True))
+        plans = {
+            client_id: (trainers[index % len(trainers)].id, WORKOUT_PATTERNS[index % len(WORKOUT_PATTERNS)], 6 + index % 14)
+            for index, client_id in enumerate(client_ids)
+        }
+        insert_rows(ProgramClient, ['client', 'program', 'program_type', 'preferred_time', 'workout_days', 'workout_days_mask',
+                                    'status', 'trainer', 'updated_at'], (
+            (client_id, programs[client_id % len(programs)].id, 'personal', json.dumps([[f'{hour:02d}:00', f'{hour + 1:02d}:00']]),
+             json.dumps(days), weekday_mask(days), 'active', trainer_id, now)
+            for client_id, (trainer_id, days, hour) in plans.items()
+        ))
+        TrainerSlot.objects.bulk_create([
+            slot for program_client in ProgramClient.objects.select_related('program').iterator(chunk_size=2000)
+            for slot in program_client.build_trainer_slots()
+        ], batch_size=1000)
+        insert_rows(ConsulationSchedules, ['client', 'user', 'no_of_consultation', 'datetime', 'type', 'status', 'created_at'], (
+            (client_id, trainer_id, 2, now, 'trainer', False, now) for client_id, (trainer_id, _, _) in plans.items()
+        ))
+        log(f"Seeded {len(client_ids)} clients with plans, slots and consultations")
+
+        # Weekly plans from a shared start date up to next week, attendance on every planned date before today.
+        # Weeks only depend on the workout pattern, so each pattern's weeks are built once and reused per client.
+        pattern_weeks = {}
+        for days in WORKOUT_PATTERNS:
+            mask, week_start, built = weekday_mask(days), first_week, []
+            while week_start <= today + timedelta(days=7):
+                built.append(build_week(None, None, len(built) + 1, week_start, mask, len(days)))
+                week_start = built[-1].week_end_date + timedelta(days=1)
+            past = [date for week in built for date in week.week_workout_dates if date < str(today)]
+            pattern_weeks[mask] = ([
+                (week.week_no, week.no_of_days, week.week_no_of_days, str(week.week_start_date), str(week.week_end_date),
+                 json.dumps(week.week_workout_dates), json.dumps(week.week_workout_days), week.week_end_date < today, now, now)
+                for week in built
+            ], past[-days_per_client:])
+        week_fields = ['client', 'trainer_id', 'week_no', 'no_of_days', 'week_no_of_days', 'week_start_date', 'week_end_date',
+                       'week_workout_dates', 'week_workout_days', 'status', 'created_at', 'updated_at']
+        weeks = (
+            (client_id, trainer_id) + week
+            for client_id, (trainer_id, days, _) in plans.items() for week in pattern_weeks[weekday_mask(days)][0]
+        )
+        log(f"Seeded {insert_rows(WeeklyWorkoutUpdates, week_fields, weeks)} weekly plans")
+        attended = insert_rows(ClienAttendanceUpdates, ['client', 'trainer_id', 'workout_date', 'status', 'created_at', 'updated_at'], (
+            (client_id, trainer_id, date, rng.random() < 0.85, now, now)
+            for client_id, (trainer_id, days, _) in plans.items() for date in pattern_weeks[weekday_mask(days)][1]
+        ))
+        log(f"Seeded {attended} attendance rows")
+
+        latest_weeks = WeeklyWorkoutUpdates.objects.filter(week_start_date__lte=today, week_end_date__gte=today)
+        insert_rows(WeeklyWorkoutwithDaysUpdates, ['client', 'trainer_id', 'weekly_updates_id', 'week_no', 'day_no', 'workout_date',
+                                                   'workout_type', 'workout_sets', 'workout_reps', 'created_at', 'updated_at'], (
+            (client_id, trainer_id, week_id, week_no, day_no, date, rng.choice(['Squat', 'Bench', 'Row', 'Deadlift']), 3, 10, now, now)
+            for week_id, client_id, trainer_id, week_no, dates in latest_weeks.values_list(
+                'id', 'client_id', 'trainer_id_id', 'week_no', 'week_workout_dates').iterator()
+            for day_no, date in enumerate(dates, 1)
+        ))
+
+        insert_rows(Leads, ['name', 'source', 'sales_id', 'phone', 'email', 'status', 'country', 'program_type', 'program_name',
+                            'lead_date', 'follow_up_date', 'created_at', 'updated_at'], (
+            (f'Lead {index}', rng.choice(['ad', 'referral', 'walk-in']), sales[index % len(sales)].id, '9000000000',
+             f'lead{index}@benchmark.local', 'New Lead', countries[index % len(countries)].id, 'personal', 'Program 1',
+             str(today - timedelta(days=60)), str(today + timedelta(days=rng.randint(-30, 30))), now, now)
+            for index in range(counts['leads'])
+        ))
+        insert_rows(LeadsFollowup, ['lead', 'sales', 'follow_up_date', 'status', 'created_at', 'updated_at'], (
+            (lead_id, sales_id, str(follow_up_date), index % 2 == 0, now, now)
+            for index, (lead_id, sales_id, follow_up_date) in enumerate(
+                Leads.objects.order_by('id').values_list('id', 'sales_id_id', 'follow_up_date').iterator())
+        ))
+        log(f"Seeded {counts['leads']} leads with follow-ups")
+
+    trainers[0].contract.save('contract.pdf', ContentFile(b'%PDF-1.4\n' + bytes(range(256)) * 4096))
+    rebuild_rollups()
+    log("Rebuilt attendance rollups")
+
+
+def routes():
+    """
+    (url name, method, path, user, payload[, headers]) for every route in urls.py, built from seeded rows.
+    Writes run inside a rolled-back transaction, so every iteration sees the same data.
+    """
+    today = timezone.localdate()
+    admin = User.objects.get(email='admin0@benchmark.local')
+    trainer = User.objects.get(email='trainer0@benchmark.local')
+    sales = User.objects.get(email='sales0@benchmark.local')
+    client = Client.objects.filter(programs__trainer=trainer).order_by('id').first()
+    week = WeeklyWorkoutUpdates.objects.filter(client=client).order_by('-week_no').first()
+    lead = Leads.objects.filter(sales_id=sales).order_by('id').first()
+    program = Program.objects.order_by('id').first()
+    trainer_role = Role.objects.get(rolename='trainer')
+    refresh = str(RefreshToken.for_user(trainer))
+    day = f'{today:%Y-%m-%d}'
+    slot = {'days': 'monday,wednesday', 'start': '07:00', 'end': '08:00'}
+    new_lead = {'name': 'Bench Lead', 'source': 'ad', 'phone': '1', 'email': 'bench-lead@benchmark.local',
+                'country': Country.objects.values_list('id', flat=True).first(), 'program_name': 'Program 1'}
+
+    return [
+        ('login', 'post', reverse('login'), None, {'email': trainer.email, 'password': BENCHMARK_PASSWORD}),
+        ('token-obtain', 'post', reverse('token-obtain'), None, {'email': trainer.email, 'password': BENCHMARK_PASSWORD}),
+        ('token-refresh', 'post', reverse('token-refresh'), None, {'refresh': refresh}),
+        ('country-list', 'get', reverse('country-list'), trainer, None),
+        ('rest_user_details', 'get', reverse('rest_user_details'), trainer, None),
+        ('user-create', 'post', reverse('user-create'), admin, {
+            'name': 'Bench', 'phone': '1', 'email': 'bench-user@benchmark.local', 'password': 'pw', 'country': 'IN',
+            'role_id': trainer_role.id}),
+        ('user-list', 'get', reverse('user-list'), admin, None),
+        ('user-file', 'get', reverse('user-file', args=[trainer.id, 'contract']), trainer, None),
+        ('role-list', 'get', reverse('role-list'), admin, None),
+        ('user-role', 'get', reverse('user-role', args=[trainer_role.id]), admin, None),
+        ('program-create', 'post', reverse('program-create'), admin, {'name': 'Bench Program', 'program_type': ['personal']}),
+        ('program-list', 'get', reverse('program-list'), admin, None),
+        ('program-client-create', 'post', reverse('program-client-create'), admin, {
+            'client': client.id, 'program': program.id, 'program_type': 'personal', 'status': 'active', 'trainer': trainer.id,
+            'workout_days': ['Sunday'], 'preferred_time': [['05:00', '06:00']]}),
+        ('newclient-list', 'get', reverse('newclient-list'), trainer, None),
+        ('client-list', 'get', reverse('client-list'), trainer, None),
+        ('client-details', 'get', reverse('client-details', args=[client.id]), trainer, None),
+        ('client-list-by-date', 'get', reverse('client-list-by-date', args=[day]), trainer, None),
+        ('client-list-by-month', 'get', reverse('client-list-by-month', args=[client.id, today.year, today.month]), trainer, None),
+        ('client-list-by-year', 'get', reverse('client-list-by-year', args=[client.id, today.year]), trainer, None),
+        ('mark-client-attendance', 'post', reverse('mark-client-attendance'), trainer, {'client_id': client.id, 'workout_date': day}),
+        ('mark-client-attendance-bulk', 'post', reverse('mark-client-attendance-bulk'), trainer, [
+            {'client_id': client_id, 'workout_date': day}
+            for client_id in Client.objects.filter(programs__trainer=trainer).order_by('id').values_list('id', flat=True)[:50]
+        ]),
+        ('attendance-rollups', 'get', reverse('attendance-rollups') + f'?year={today.year}', trainer, None),
+        ('weekly-workout-details', 'get', reverse('weekly-workout-details', args=[client.id]), trainer, None),
+        ('weekly-workout-updates', 'post', reverse('weekly-workout-updates', args=[client.id, week.id]), trainer, [
+            {'workout_type': 'Squat', 'sets': 3, 'reps': 10, 'week_no': week.week_no, 'day': 1, 'date': day}]),
+        ('schedule-consultation', 'post', reverse('schedule-consultation'), trainer, {
+            'client': client.id, 'no_of_consultation': 1, 'datetime': timezone.now().isoformat(), 'type': 'trainer'}),
+        ('trainer_consulation_details', 'post', reverse('trainer_consulation_details'), trainer, {
+            'client': client.id, 'no_of_consultation': 1, 'current_acitivity_level': 'moderate'}),
+        ('consulation-schedule-list', 'get', reverse('consulation-schedule-list'), trainer, None),
+        ('program-list-type', 'get', reverse('program-list-type', args=['personal']), trainer, None),
+        ('availability-trainer', 'get', reverse('availability-trainer', args=[trainer.id]), trainer, None),
+        ('conflicts-trainer', 'get', reverse('conflicts-trainer', args=[trainer.id]) + '?' + '&'.join(f'{k}={v}' for k, v in slot.items()), trainer, None),
+        ('match-trainers', 'get', reverse('match-trainers') + '?' + '&'.join(f'{k}={v}' for k, v in slot.items()), admin, None),
+        ('timing-trainer', 'get', reverse('timing-trainer', args=[trainer.id]), trainer, None),
+        ('lead-create', 'post', reverse('lead-create'), sales, new_lead),
+        ('lead-list', 'get', reverse('lead-list'), sales, None),
+        ('lead-view', 'get', reverse('lead-view', args=[lead.id]), sales, None),
+        ('import-leads', 'post', reverse('import-leads'), sales, 'name,source,phone,email,country_code,program_name\n' + ''.join(
+            f'Import {index},ad,1,import{index}@benchmark.local,IN,Program 1\n' for index in range(500))),
+        ('followup-queue', 'get', reverse('followup-queue'), sales, None),
+        ('export', 'get', reverse('export', args=['leads', 'csv']), admin, None),
+        ('metrics', 'get', reverse('metrics'), None, None, {'Authorization': f'Bearer {settings.METRICS_TOKEN}'}),
+    ]
+
+
+def seeded_counts():
+    return {
+        'trainers': UserRole.objects.filter(role__rolename='trainer').count(),
+        'clients': Client.objects.count(),
+        'attendance': ClienAttendanceUpdates.objects.count(),
+        'leads': Leads.objects.count(),
+    }
+
+
+def call(api, method, path, payload, headers=None):
+    if method == 'get':
+        return api.get(path, headers=headers)
+    if isinstance(payload, str):
+        return api.post(path, {'file': ContentFile(payload.encode(), name='leads.csv')}, format='multipart', headers=headers)
+    return api.post(path, payload, format='json', headers=headers)
+
+
+def measure(name, method, path, user, payload, iterations, warmup, headers=None):
+    api = APIClient(raise_request_exception=False)
+    if user is not None:
+        api.force_authenticate(user)
+    timings, queries, status = [], [], None
+    for iteration in range(warmup + iterations):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = call(api, method, path, payload, headers)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        status = response.status_code
+        if iteration >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+
+    timings.sort()
+    return {
+        'method': method.upper(),
+        'path': path,
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'queries': max(queries),
+    }
+
+
+def run(iterations=20, warmup=2, only=None, log=print):
+    cache.clear()
+    report = {}
+    planned = routes()
+    missing = {pattern.name for pattern in urlpatterns} - {route[0] for route in planned}
+    if missing:
+        log(f"Not benchmarked, add them to routes(): {', '.join(sorted(missing))}")
+    for name, method, path, user, payload, *headers in planned:
+        if only and name not in only:
+            continue
+        if connection.vendor == 'sqlite' and name in SQLITE_UNSUPPORTED:
+            report[name] = {'method': method.upper(), 'path': path, 'skipped': SQLITE_UNSUPPORTED[name]}
+            log(f"{name:30} skipped, {SQLITE_UNSUPPORTED[name]}")
+            continue
+        result = report[name] = measure(name, method, path, user, payload, iterations, warmup, *headers)
+        if result['status'] >= 400:
+            # A failing request is no timing to compare between commits
+            result.update(p50_ms=None, p95_ms=None, error=True)
+            log(f"{name:30} {result['status']} FAILED, left out of the timings")
+            continue
+        log(f"{name:30} {result['status']} p50 {result['p50_ms']:>9}ms  p95 {result['p95_ms']:>9}ms  "
+            f"{result['queries']} queries")
+    return report
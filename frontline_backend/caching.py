@@ -0,0 +1,55 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Reference data (countries, roles, programs) is cached under versioned keys. Saving or deleting
+# one of those models bumps its group's version, so stale entries are never read again and age
+# out through the cache's own TTL/MAX_ENTRIES culling.
+REFERENCE_CACHE_TIMEOUT = getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(group):
+    return f'reference:{group}:version'
+
+
+def get_version(group):
+    version = cache.get(_version_key(group))
+    if version is None:
+        # Start from a timestamp rather than 1, so an evicted version key can't bring back old entries
+        cache.add(_version_key(group), time.time_ns(), None)
+        version = cache.get(_version_key(group), 0)
+    return version
+
+
+def bump_version(group):
+    try:
+        cache.incr(_version_key(group))
+    except ValueError:
+        cache.set(_version_key(group), time.time_ns(), None)
+
+
+def cached_reference(group, key, build, timeout=REFERENCE_CACHE_TIMEOUT):
+    cache_key = f'reference:{group}:{get_version(group)}:{key}'
+    data = cache.get(cache_key)
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, timeout)
+    return data
+
+
+async def aget_version(group):
+    version = await cache.aget(_version_key(group))
+    if version is None:
+        await cache.aadd(_version_key(group), time.time_ns(), None)
+        version = await cache.aget(_version_key(group), 0)
+    return version
+
+
+async def acached_reference(group, key, build, timeout=REFERENCE_CACHE_TIMEOUT):
+    # cached_reference for async views, build is a coroutine function
+    cache_key = f'reference:{group}:{await aget_version(group)}:{key}'
+    data = await cache.aget(cache_key)
+    if data is None:
+        data = await build()
+        await cache.aset(cache_key, data, timeout)
+    return data
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from calendar import monthrange
+from .models import ClienAttendanceUpdates
+from .weekdays import weekday_bit
+
+
+def month_range(year, month, months=1):
+    # First and last date covered by `months` consecutive months starting at year/month
+    start_date = date(year, month, 1)
+    end_month_index = year * 12 + (month - 1) + (months - 1)
+    end_year, end_month = divmod(end_month_index, 12)
+    end_month += 1
+    end_date = date(end_year, end_month, monthrange(end_year, end_month)[1])
+    return start_date, end_date
+
+
+def build_workout_calendar(client, program_client, start_date, end_date):
+    # Start at the client's first workout day, the range can't begin before it
+    if client.workout_start_date and client.workout_start_date > start_date:
+        start_date = client.workout_start_date
+    if start_date > end_date:
+        return []
+
+    # One range query for the whole period, joined to the workout days by date below
+    attendances = {
+        attendance.workout_date: attendance
+        for attendance in ClienAttendanceUpdates.objects.filter(
+            client=client,
+            workout_date__range=(start_date, end_date)
+        ).order_by('-id')  # oldest row wins on duplicates, same as .first()
+    }
+
+    workout_dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        if program_client.workout_days_mask & weekday_bit(current_date):
+            attendance = attendances.get(current_date)
+            workout_dates.append({
+                'date': current_date,
+                'attended': bool(attendance),
+                'attendance_data': {
+                    'id': attendance.id,
+                    'trainer_id': attendance.trainer_id_id,
+                    'status': attendance.status,
+                    'created_at': attendance.created_at,
+                } if attendance else None
+            })
+        current_date += timedelta(days=1)
+
+    return workout_dates
@@ -0,0 +1,66 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def _scope_aggregates(timestamp_fields, count_fields):
+    aggregates = {}
+    for index, field in enumerate(count_fields):
+        aggregates[f'count_{index}'] = Count(field, distinct=True)
+    for index, field in enumerate(timestamp_fields):
+        aggregates[f'last_{index}'] = Max(field)
+    return aggregates
+
+
+def _validators_from(request, result, timestamp_fields, count_fields):
+    timestamps = [result[f'last_{index}'] for index in range(len(timestamp_fields)) if result[f'last_{index}']]
+    last_modified = max(timestamps) if timestamps else None
+    counts = [result[f'count_{index}'] for index in range(len(count_fields))]
+    fingerprint = repr((request.get_full_path(), counts, [value.isoformat() for value in timestamps]))
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    return etag, last_modified
+
+
+def scope_validators(request, queryset, *timestamp_fields, count_fields=('id',)):
+    # One aggregate over the scope: row counts plus the newest of each updated_at field.
+    # The counts catch deletes, the timestamps catch inserts and edits.
+    result = queryset.order_by().aggregate(**_scope_aggregates(timestamp_fields, count_fields))
+    return _validators_from(request, result, timestamp_fields, count_fields)
+
+
+async def ascope_validators(request, queryset, *timestamp_fields, count_fields=('id',)):
+    result = await queryset.order_by().aaggregate(**_scope_aggregates(timestamp_fields, count_fields))
+    return _validators_from(request, result, timestamp_fields, count_fields)
+
+
+def _not_modified(request, validators):
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None)
+
+
+def _tag(response, validators):
+    etag, last_modified = validators
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+        # Let the app keep its copy but revalidate it on every screen focus
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, validators, build_response):
+    # 304 when If-None-Match/If-Modified-Since still match, else build and tag the full response
+    response = _not_modified(request, validators)
+    if response is None:
+        response = build_response()
+    return _tag(response, validators)
+
+
+async def aconditional_response(request, validators, build_response):
+    # conditional_response for async views, build_response is a coroutine function
+    response = _not_modified(request, validators)
+    if response is None:
+        response = await build_response()
+    return _tag(response, validators)
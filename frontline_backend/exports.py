@@ -0,0 +1,98 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from .models import Leads, Client, ClienAttendanceUpdates
+
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Export name -> (queryset, [(column, ORM path)]), related fields are joined in the same query
+EXPORTS = {
+    'leads': (
+        lambda: Leads.objects.all(),
+        [
+            ('id', 'id'), ('name', 'name'), ('source', 'source'), ('sales_id', 'sales_id'),
+            ('sales_name', 'sales_id__name'), ('phone', 'phone'), ('email', 'email'), ('status', 'status'),
+            ('country_code', 'country__country_code'), ('country_name', 'country__country_name'),
+            ('program_type', 'program_type'), ('program_name', 'program_name'), ('lead_date', 'lead_date'),
+            ('follow_up_date', 'follow_up_date'), ('notes', 'notes'), ('created_at', 'created_at'),
+        ],
+    ),
+    'clients': (
+        # One row per client program, clients without a program still get a row
+        lambda: Client.objects.all(),
+        [
+            ('id', 'id'), ('client_id', 'client_id'), ('name', 'name'), ('email', 'email'), ('phone', 'phone'),
+            ('source', 'source'), ('status', 'status'), ('new_client', 'new_client'),
+            ('workout_start_date', 'workout_start_date'), ('program_client_id', 'programs__id'),
+            ('program', 'programs__program__name'), ('program_type', 'programs__program_type'),
+            ('program_status', 'programs__status'), ('workout_days', 'programs__workout_days'),
+            ('preferred_time', 'programs__preferred_time'), ('trainer_id', 'programs__trainer_id'),
+            ('trainer', 'programs__trainer__name'), ('dietitian_id', 'programs__dietitian_id'),
+            ('dietitian', 'programs__dietitian__name'),
+        ],
+    ),
+    'attendance': (
+        lambda: ClienAttendanceUpdates.objects.all(),
+        [
+            ('id', 'id'), ('client_id', 'client_id'), ('client', 'client__name'), ('trainer_id', 'trainer_id_id'),
+            ('trainer', 'trainer_id__name'), ('workout_date', 'workout_date'), ('status', 'status'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+}
+
+
+class Echo:
+    # File-like object for csv.writer that hands each line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def iterate_rows(queryset, paths, chunk_size=EXPORT_CHUNK_SIZE):
+    # Keyset batches on the primary key (plus the joined row for multi-row exports), so memory
+    # stays flat even where the database driver buffers a whole result set, as MySQL's does
+    order = ['id', 'programs__id'] if 'programs__id' in paths else ['id']
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(id__gt=last)
+        rows = list(batch.order_by(*order).values_list(*paths)[:chunk_size])
+        if not rows:
+            return
+        # Don't cut a client's program rows in half across two batches
+        if len(rows) == chunk_size and order != ['id']:
+            cut_id = rows[-1][0]
+            complete = [row for row in rows if row[0] != cut_id]
+            if complete:
+                rows = complete
+            else:
+                rows = list(queryset.filter(id=cut_id).order_by(*order).values_list(*paths))
+        yield from rows
+        last = rows[-1][0]
+
+
+def export_lines(name, export_format):
+    queryset, columns = EXPORTS[name]
+    header = [column for column, _ in columns]
+    rows = iterate_rows(queryset(), [path for _, path in columns])
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (list, dict)) else value for value in row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(name, export_format):
+    response = StreamingHttpResponse(export_lines(name, export_format), content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+    return response
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from .storage import blob_storage, is_blob
+
+FILE_CHUNK_SIZE = getattr(settings, 'FILE_CHUNK_SIZE', 64 * 1024)
+# None streams from Django, 'sendfile' hands off with X-Sendfile (Apache/lighttpd),
+# 'accel' with X-Accel-Redirect under FILE_ACCEL_PREFIX (an internal nginx location on MEDIA_ROOT)
+FILE_SERVING_MODE = getattr(settings, 'FILE_SERVING_MODE', None)
+FILE_ACCEL_PREFIX = getattr(settings, 'FILE_ACCEL_PREFIX', '/protected/')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(name, stat):
+    # Blob names carry the sha256 of the content, older uploads fall back to size and mtime
+    if is_blob(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to send the whole file
+    (no header, several ranges or a syntax we don't handle), or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            return False
+    else:
+        # Suffix range: the last N bytes
+        length = min(int(last), size)
+        if length == 0:
+            return False
+        start, end = size - length, size - 1
+    return start, end
+
+
+def read_range(path, start, length, chunk_size=FILE_CHUNK_SIZE):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, name, download_name=None):
+    """
+    Serve a stored upload with ETag/Last-Modified validators, conditional GETs and single byte
+    ranges, read in FILE_CHUNK_SIZE pieces. With FILE_SERVING_MODE set, only headers are built
+    here and the front server sends the bytes (and handles Range itself).
+    """
+    path = blob_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+
+    etag = file_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, name, path, stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if response.status_code in (200, 206):
+        response['Content-Type'] = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        filename = (download_name or os.path.basename(name)).replace('"', '')
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _file_response(request, name, path, size, etag):
+    if FILE_SERVING_MODE == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    if FILE_SERVING_MODE == 'accel':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = FILE_ACCEL_PREFIX + name
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and etag not in parse_etags(if_range):
+        # The client's partial copy is stale, send the current file whole
+        byte_range = None
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'))
+        response.block_size = FILE_CHUNK_SIZE
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
@@ -0,0 +1,146 @@
+import csv
+import json
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from .models import Country, Leads, LeadsFollowup
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+REQUIRED_COLUMNS = ('name', 'source', 'phone', 'email', 'country_code', 'program_name')
+DATE_COLUMNS = ('lead_date', 'follow_up_date')
+JSON_COLUMNS = ('preferred_days', 'preferred_time')
+TEXT_COLUMNS = ('name', 'source', 'phone', 'email', 'country_code', 'status', 'program_type', 'program_name', 'notes')
+# Checked per row since the import skips LeadCreateSerializer, and strict MySQL fails the whole
+# batch with a DataError on an over-long value
+MAX_LENGTHS = {column: Leads._meta.get_field(column).max_length for column in TEXT_COLUMNS if column != 'country_code'}
+
+
+def country_map():
+    # Country code -> id, loaded once per import instead of one lookup per row
+    countries = {}
+    for country_id, code in Country.objects.order_by('id').values_list('id', 'country_code'):
+        countries.setdefault(code.strip().upper(), country_id)
+    return countries
+
+
+def parse_row(row, countries):
+    # CSV row -> Leads field values, raises ValueError with a readable reason
+    values = {}
+    for column in TEXT_COLUMNS:
+        value = (row.get(column) or '').strip()
+        if value:
+            values[column] = value
+    for column, max_length in MAX_LENGTHS.items():
+        if len(values.get(column, '')) > max_length:
+            raise ValueError(f"{column} is longer than {max_length} characters")
+    missing = [column for column in REQUIRED_COLUMNS if column not in values]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        validate_email(values['email'])
+    except ValidationError:
+        raise ValueError(f"Invalid email {values['email']}")
+
+    for column in DATE_COLUMNS:
+        value = (row.get(column) or '').strip()
+        if value:
+            try:
+                values[column] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f"Invalid {column} {value}, expected YYYY-MM-DD")
+    for column in JSON_COLUMNS:
+        value = (row.get(column) or '').strip()
+        if value:
+            try:
+                values[column] = json.loads(value)
+            except ValueError:
+                raise ValueError(f"Invalid {column}, expected JSON")
+
+    code = values.pop('country_code').upper()
+    if code not in countries:
+        raise ValueError(f"Unknown country_code {code}")
+    values['country_id'] = countries[code]
+    return values
+
+
+def import_leads(lines, sales_id, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Stream CSV lines into Leads, one batch of rows at a time: emails already stored or repeated
+    earlier in the file are skipped, the rest are bulk inserted with their initial follow-up.
+    Returns the import report.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+
+    countries = country_map()
+    report = {'rows': 0, 'created': 0, 'duplicates_existing': 0, 'duplicates_in_file': 0, 'invalid': 0, 'errors': []}
+    seen = set()
+    batch = []
+
+    def error(line, reason):
+        report['invalid'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'error': reason})
+
+    for row in reader:
+        report['rows'] += 1
+        try:
+            values = parse_row(row, countries)
+        except ValueError as exc:
+            error(reader.line_num, str(exc))
+            continue
+        key = values['email'].lower()
+        if key in seen:
+            report['duplicates_in_file'] += 1
+            continue
+        seen.add(key)
+        batch.append(values)
+        if len(batch) >= batch_size:
+            _import_batch(batch, sales_id, report)
+            batch = []
+    if batch:
+        _import_batch(batch, sales_id, report)
+    return report
+
+
+def existing_emails(emails):
+    return {email.lower() for email in Leads.objects.filter(email__in=emails).values_list('email', flat=True)}
+
+
+def _import_batch(batch, sales_id, report):
+    existing = existing_emails([values['email'] for values in batch])
+    new_rows = [values for values in batch if values['email'].lower() not in existing]
+    report['duplicates_existing'] += len(batch) - len(new_rows)
+    if not new_rows:
+        return
+
+    try:
+        with transaction.atomic():
+            report['created'] += _insert_leads(new_rows, sales_id)
+    except IntegrityError:
+        # Another import or a signup stored some of these emails since the check: redo the batch
+        # row by row, each under its own savepoint, and count the rows the unique email rejects
+        for values in new_rows:
+            try:
+                with transaction.atomic():
+                    report['created'] += _insert_leads([values], sales_id)
+            except IntegrityError:
+                report['duplicates_existing'] += 1
+
+
+def _insert_leads(rows, sales_id):
+    leads = Leads.objects.bulk_create([Leads(sales_id_id=sales_id, **values) for values in rows])
+    if any(lead.pk is None for lead in leads):
+        # MySQL does not hand back the new primary keys, read them back by the unique email
+        ids = dict(Leads.objects.filter(email__in=[lead.email for lead in leads]).values_list('email', 'id'))
+        for lead in leads:
+            lead.pk = ids[lead.email]
+    LeadsFollowup.objects.bulk_create([
+        LeadsFollowup(lead_id=lead.pk, sales_id=sales_id, follow_up_date=lead.follow_up_date, status=False)
+        for lead in leads
+    ])
+    return len(leads)
@@ -0,0 +1,72 @@
+import json
+import platform
+import subprocess
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from frontline_backend.benchmarks import DEFAULT_COUNTS, seed, seeded_counts, run
+from frontline_backend.models import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a SQLite database and time every API route (p50/p95 and query count) into a JSON report. "
+        "Run with --settings=frontline_fitness.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for all seed counts')
+        for name, default in DEFAULT_COUNTS.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', help='Only time this URL name, repeatable')
+        parser.add_argument('--reseed', action='store_true', help='Flush and seed again even if data exists')
+        parser.add_argument('--output', default='benchmark-report.json')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Refusing to seed a non-SQLite database, run with --settings=frontline_fitness.settings_benchmark')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        counts = {name: max(1, int(options[name] * options['scale'])) for name in DEFAULT_COUNTS}
+
+        call_command('migrate', verbosity=0)
+        if options['reseed']:
+            call_command('flush', interactive=False, verbosity=0)
+        if not Client.objects.exists():
+            self.stdout.write(f"Seeding {counts}")
+            seed(counts, log=self.stdout.write)
+        else:
+            self.stdout.write('Reusing the seeded database, pass --reseed after changing counts')
+
+        routes = run(iterations=options['iterations'], warmup=options['warmup'], only=options['route'], log=self.stdout.write)
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'created_at': timezone.now().isoformat(),
+                'counts': seeded_counts(),
+                'iterations': options['iterations'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'routes': routes,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write('\n')
+        failed = sorted(name for name, result in routes.items() if result.get('error'))
+        if failed:
+            raise CommandError(f"Wrote {options['output']}, but these routes answered with an error: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(routes)} routes to {options['output']}"))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
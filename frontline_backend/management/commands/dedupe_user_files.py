@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from frontline_backend.models import User, StoredBlob
+from frontline_backend.signals import BLOB_FIELDS
+from frontline_backend.storage import blob_storage, is_blob
+
+
+class Command(BaseCommand):
+    help = "Move resumes and contracts uploaded before content-addressed storage into blobs/, one copy per distinct file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files on disk')
+
+    def handle(self, *args, **options):
+        moved, missing, originals = 0, 0, set()
+        for user in User.objects.only('id', *BLOB_FIELDS).iterator():
+            for field in BLOB_FIELDS:
+                name = getattr(user, field).name
+                if not name or is_blob(name):
+                    continue
+                if not blob_storage.exists(name):
+                    missing += 1
+                    continue
+                with blob_storage.open(name) as original:
+                    blob = blob_storage.save(name, original)
+                with transaction.atomic():
+                    # update() skips the User signals, the blob is counted here instead
+                    User.objects.filter(pk=user.pk).update(**{field: blob})
+                    StoredBlob.retain(blob)
+                originals.add(name)
+                moved += 1
+
+        if not options['keep_originals']:
+            for name in originals:
+                blob_storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} files into {StoredBlob.objects.count()} blobs, {missing} referenced files were missing"
+        ))
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from frontline_backend.schedules import plan_roster_weeks, create_weeks, week_end_date
+
+
+class Command(BaseCommand):
+    help = "Pre-generate WeeklyWorkoutUpdates rows for every active client in one batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=1, help='Number of weeks ahead of the current week to cover')
+        parser.add_argument('--date', help='Reference date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without saving')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid --date, expected YYYY-MM-DD')
+        else:
+            today = timezone.localdate()
+        if options['weeks'] < 0:
+            raise CommandError('--weeks must be zero or more')
+
+        until_date = week_end_date(today) + timedelta(weeks=options['weeks'])
+        weeks = plan_roster_weeks(until_date)
+        clients = len({week.client_id for week in weeks})
+
+        if options['dry_run']:
+            self.stdout.write(f"Would create {len(weeks)} weeks for {clients} clients up to {until_date}")
+            return
+
+        with transaction.atomic():
+            create_weeks(weeks, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Created {len(weeks)} weeks for {clients} clients up to {until_date}"))
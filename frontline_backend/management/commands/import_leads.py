@@ -0,0 +1,28 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from frontline_backend.imports import import_leads, IMPORT_BATCH_SIZE
+from frontline_backend.models import User
+
+
+class Command(BaseCommand):
+    help = "Import leads from a CSV file, skipping emails that already exist"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--sales', required=True, help='Email or id of the sales user the leads are assigned to')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        lookup = {'id': options['sales']} if options['sales'].isdigit() else {'email': options['sales']}
+        sales_id = User.objects.filter(**lookup).values_list('id', flat=True).first()
+        if sales_id is None:
+            raise CommandError(f"No user {options['sales']}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = import_leads(lines, sales_id, batch_size=options['batch_size'])
+        except (OSError, ValueError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(json.dumps(report, indent=2, default=str))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from frontline_backend.models import AttendanceRollup
+from frontline_backend.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly attendance rollups from weekly plans and attendance rows"
+
+    def handle(self, *args, **options):
+        months = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {AttendanceRollup.objects.count()} rollup rows covering {months} client months"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from frontline_backend.models import ProgramClient, TrainerSlot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized trainer timetable from ProgramClient rows"
+
+    def handle(self, *args, **options):
+        slots = []
+        program_clients = ProgramClient.objects.filter(status='active', trainer__isnull=False).select_related('program')
+        for program_client in program_clients.iterator(chunk_size=1000):
+            slots.extend(program_client.build_trainer_slots())
+
+        with transaction.atomic():
+            TrainerSlot.objects.all().delete()
+            TrainerSlot.objects.bulk_create(slots, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(slots)} trainer slots"))
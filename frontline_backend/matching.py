@@ -0,0 +1,48 @@
+from .models import User, TrainerSlot
+from .timetable import interval_bits
+from .weekdays import WEEKDAYS
+
+
+def match_trainers(days, start_time, end_time):
+    # Rank every trainer for a weekly session on `days` (WEEKDAYS indexes) between start_time and end_time.
+    # Two queries: trainers with their availability index, then all their booked slots.
+    wanted = interval_bits(start_time, end_time)
+    trainers = list(
+        User.objects.filter(is_active=True, userrole__role__rolename__iexact='trainer')
+        .select_related('availability_index')
+        .distinct()
+    )
+
+    booked = {trainer.id: [0] * len(WEEKDAYS) for trainer in trainers}
+    booked_minutes = dict.fromkeys(booked, 0)
+    slots = TrainerSlot.objects.filter(trainer_id__in=booked, start_time__isnull=False).values_list('trainer_id', 'day', 'start_time', 'end_time')
+    for trainer_id, day, slot_start, slot_end in slots:
+        booked[trainer_id][day] |= interval_bits(slot_start, slot_end)
+        booked_minutes[trainer_id] += (slot_end.hour * 60 + slot_end.minute) - (slot_start.hour * 60 + slot_start.minute)
+
+    candidates = []
+    for trainer in trainers:
+        index = getattr(trainer, 'availability_index', None)
+        available = index.bitsets if index else [0] * len(WEEKDAYS)
+        free_days, busy_days, unavailable_days = [], [], []
+        for day in days:
+            if available[day] & wanted != wanted:
+                unavailable_days.append(WEEKDAYS[day])
+            elif booked[trainer.id][day] & wanted:
+                busy_days.append(WEEKDAYS[day])
+            else:
+                free_days.append(WEEKDAYS[day])
+        candidates.append({
+            'id': trainer.id,
+            'user_id': trainer.user_id,
+            'name': trainer.name,
+            'available': len(free_days) == len(days),
+            'free_days': free_days,
+            'busy_days': busy_days,
+            'unavailable_days': unavailable_days,
+            'booked_minutes_per_week': booked_minutes[trainer.id],
+        })
+
+    # Most requested days free first, then the least loaded trainer
+    candidates.sort(key=lambda candidate: (-len(candidate['free_days']), candidate['booked_minutes_per_week'], candidate['id']))
+    return candidates
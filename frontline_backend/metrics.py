@@ -0,0 +1,130 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+
+# Shared local directory each worker process writes its totals to, metrics are off without it.
+# Clear it when the server (re)starts, as with any per-pid metrics directory.
+METRICS_DIR = getattr(settings, 'METRICS_DIR', None)
+METRICS_FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def new_series():
+    return {
+        'buckets': [0] * (len(LATENCY_BUCKETS) + 1),  # last one is +Inf
+        'duration': 0.0,
+        'db_duration': 0.0,
+        'bytes': 0,
+        'count': 0,
+        'statuses': defaultdict(int),
+    }
+
+
+class MetricsStore:
+    """
+    This process's per (url name, method) totals. Requests only touch memory, the totals are
+    written to METRICS_DIR/metrics-<pid>.json at most every METRICS_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, directory, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.series = defaultdict(new_series)
+        self.lock = threading.Lock()
+        self.flushed_at = 0.0
+        self.pid = os.getpid()
+
+    def record(self, view, method, status, duration, db_duration, size):
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked worker: start from zero so the parent's totals aren't counted twice
+                self.series, self.pid = defaultdict(new_series), os.getpid()
+            series = self.series[(view, method)]
+            series['buckets'][bisect_left(LATENCY_BUCKETS, duration)] += 1
+            series['duration'] += duration
+            series['db_duration'] += db_duration
+            series['bytes'] += size
+            series['count'] += 1
+            series['statuses'][str(status)] += 1
+        if time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.flushed_at = time.monotonic()
+            data = json.dumps([{'view': view, 'method': method, **series} for (view, method), series in self.series.items()])
+            path = os.path.join(self.directory, f'metrics-{self.pid}.json')
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(data)
+        # Readers see the old or the new file, never a half-written one
+        os.replace(tmp_path, path)
+
+
+def collect(directory):
+    # Sum every worker's file into one set of series
+    merged = defaultdict(new_series)
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for item in data:
+            series = merged[(item['view'], item['method'])]
+            series['buckets'] = [total + value for total, value in zip(series['buckets'], item['buckets'])]
+            for field in ('duration', 'db_duration', 'bytes', 'count'):
+                series[field] += item[field]
+            for status, count in item['statuses'].items():
+                series['statuses'][status] += count
+    return merged
+
+
+def format_value(value):
+    return str(value) if isinstance(value, int) else f'{value:.6f}'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(merged):
+    # Prometheus text exposition format 0.0.4
+    lines = [
+        '# HELP frontline_request_duration_seconds Request latency per URL name.',
+        '# TYPE frontline_request_duration_seconds histogram',
+    ]
+    for (view, method), series in sorted(merged.items()):
+        labels = f'view="{escape(view)}",method="{escape(method)}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), series['buckets']):
+            cumulative += count
+            lines.append(f'frontline_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'frontline_request_duration_seconds_sum{{{labels}}} {format_value(series["duration"])}')
+        lines.append(f'frontline_request_duration_seconds_count{{{labels}}} {series["count"]}')
+
+    sections = [
+        ('frontline_responses_total', 'counter', 'Responses per URL name and status code.', None),
+        ('frontline_response_size_bytes_total', 'counter', 'Response body bytes per URL name.', 'bytes'),
+        ('frontline_db_duration_seconds_total', 'counter', 'Time spent in SQL per URL name.', 'db_duration'),
+    ]
+    for name, kind, help_text, field in sections:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for (view, method), series in sorted(merged.items()):
+            labels = f'view="{escape(view)}",method="{escape(method)}"'
+            if field is None:
+                for status, count in sorted(series['statuses'].items()):
+                    lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+            else:
+                lines.append(f'{name}{{{labels}}} {format_value(series[field])}')
+    return '\n'.join(lines) + '\n'
+
+
+store = MetricsStore(METRICS_DIR) if METRICS_DIR else None
@@ -0,0 +1,170 @@
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from . import metrics
+
+logger = logging.getLogger('frontline_backend.sql')
+
+SQL_INSTRUMENTATION = getattr(settings, 'SQL_INSTRUMENTATION', False)
+SQL_INSTRUMENTATION_SAMPLE_RATE = getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+SQL_REPEAT_THRESHOLD = getattr(settings, 'SQL_REPEAT_THRESHOLD', 10)
+
+PLACEHOLDER_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    # Same statement shape whatever the values or IN list length, so a loop of lookups shows up as one
+    sql = LITERAL_RE.sub('?', sql)
+    sql = PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql.replace('%s', '?')).strip()
+
+
+class SQLTimer:
+    # connection.execute_wrapper hook counting statements and their time
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryStats(SQLTimer):
+    # SQLTimer that also counts each statement's fingerprint
+    def __init__(self):
+        super().__init__()
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            self.fingerprints[fingerprint(sql)] += 1
+
+
+# Recorders of the current request. Connections are per thread, and async views run their queries
+# in a sync_to_async thread, so one hook installed on every connection (signals.install_query_hook)
+# looks the recorders up in this context variable, which follows the request into those threads.
+active_recorders = contextvars.ContextVar('active_recorders', default=())
+
+
+def dispatch_to_recorders(execute, sql, params, many, context):
+    for recorder in reversed(active_recorders.get()):
+        execute = partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def recording(recorder):
+    token = active_recorders.set(active_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        active_recorders.reset(token)
+
+
+class HybridMiddleware:
+    # Runs natively under WSGI and ASGI alike, subclasses implement begin() and finish()
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.begin(request)
+        if state is None:
+            return self.get_response(request)
+        with recording(state[0]):
+            response = self.get_response(request)
+        return self.finish(request, response, *state)
+
+    async def __acall__(self, request):
+        state = self.begin(request)
+        if state is None:
+            return await self.get_response(request)
+        with recording(state[0]):
+            response = await self.get_response(request)
+        return self.finish(request, response, *state)
+
+
+class SQLInstrumentationMiddleware(HybridMiddleware):
+    """
+    Opt-in (SQL_INSTRUMENTATION = True) per-request SQL accounting for a sample of requests
+    (SQL_INSTRUMENTATION_SAMPLE_RATE). Sampled responses get a Server-Timing header with the query
+    count and SQL time, and statements repeated more than SQL_REPEAT_THRESHOLD times are logged
+    as likely N+1 patterns. Queries run while a streaming body is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not SQL_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def begin(self, request):
+        if random.random() < SQL_INSTRUMENTATION_SAMPLE_RATE:
+            return QueryStats(), time.perf_counter()
+        return None
+
+    def finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        timings = [
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f'app;dur={(elapsed - stats.duration) * 1000:.1f}',
+        ]
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+
+        for sql, repeats in stats.fingerprints.most_common():
+            if repeats <= SQL_REPEAT_THRESHOLD:
+                break
+            logger.warning(
+                'Possible N+1: statement ran %d times in %s %s: %s',
+                repeats, request.method, request.path, sql[:500],
+            )
+        return response
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Records latency, status, response size and SQL time per URL name into metrics.store when
+    METRICS_DIR is set, served in Prometheus format by MetricsView. Streaming bodies count
+    their Content-Length when known.
+    """
+
+    def __init__(self, get_response):
+        if metrics.store is None:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def begin(self, request):
+        return SQLTimer(), time.perf_counter()
+
+    def finish(self, request, response, timer, started):
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        size = int(response.get('Content-Length') or 0) if response.streaming else len(response.content)
+        metrics.store.record(view, request.method, response.status_code, duration, timer.duration, size)
+        return response
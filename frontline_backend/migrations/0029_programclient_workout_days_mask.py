@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+# Frozen copy of frontline_backend.weekdays.weekday_mask as of this migration
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def weekday_mask(days):
+    mask = 0
+    for day in days or []:
+        day = str(day).lower()
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+
+def fill_workout_days_mask(apps, schema_editor):
+    ProgramClient = apps.get_model('frontline_backend', 'ProgramClient')
+    program_clients = list(ProgramClient.objects.exclude(workout_days=None).only('id', 'workout_days'))
+    for program_client in program_clients:
+        program_client.workout_days_mask = weekday_mask(program_client.workout_days)
+    ProgramClient.objects.bulk_update(program_clients, ['workout_days_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0028_rename_lead_id_leadsfollowup_lead_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='programclient',
+            name='workout_days_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_workout_days_mask, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='programclient',
+            index=models.Index(fields=['trainer', 'status', 'workout_days_mask'], name='programclient_trainer_days_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:25
+
+import django.db.models.deletion
+from datetime import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of frontline_backend.timetable's slot parsing as of this migration
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p']
+
+
+def parse_time(value):
+    if not isinstance(value, str):
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip().upper(), time_format).time()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_time_slots(preferred_time):
+    slots = []
+    for slot in preferred_time or []:
+        if not slot or len(slot) != 2:
+            continue
+        start, end = parse_time(slot[0]), parse_time(slot[1])
+        if start and end and start < end:
+            slots.append((start, end))
+    return slots
+
+
+def fill_trainer_slots(apps, schema_editor):
+    ProgramClient = apps.get_model('frontline_backend', 'ProgramClient')
+    TrainerSlot = apps.get_model('frontline_backend', 'TrainerSlot')
+    slots = []
+    program_clients = ProgramClient.objects.filter(status='active', trainer__isnull=False).select_related('program')
+    for program_client in program_clients.iterator():
+        for day in range(7):
+            if program_client.workout_days_mask & (1 << day):
+                for start, end in parse_time_slots(program_client.preferred_time):
+                    slots.append(TrainerSlot(
+                        trainer_id=program_client.trainer_id,
+                        program_client_id=program_client.id,
+                        program_id=program_client.program_id,
+                        client_id=program_client.client_id,
+                        program_name=program_client.program.name,
+                        day=day,
+                        start_time=start,
+                        end_time=end,
+                    ))
+    TrainerSlot.objects.bulk_create(slots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0029_programclient_workout_days_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('program_name', models.CharField(max_length=255)),
+                ('day', models.PositiveSmallIntegerField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='frontline_backend.client')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='frontline_backend.program')),
+                ('program_client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trainer_slots', to='frontline_backend.programclient')),
+                ('trainer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trainer_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trainer', 'day', 'start_time', 'end_time'], name='trainerslot_interval_idx')],
+            },
+        ),
+        migrations.RunPython(fill_trainer_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from datetime import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of frontline_backend.timetable's availability bitsets as of this migration
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p']
+SLOT_MINUTES = 15
+FULL_DAY = (1 << (24 * 60 // SLOT_MINUTES)) - 1
+
+
+def parse_time(value):
+    if not isinstance(value, str):
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip().upper(), time_format).time()
+        except ValueError:
+            continue
+    return None
+
+
+def available_intervals(available_time):
+    if isinstance(available_time, dict):
+        available_time = [[available_time.get('start'), available_time.get('end')]]
+    elif available_time and len(available_time) == 2 and all(isinstance(value, str) for value in available_time):
+        available_time = [available_time]
+    intervals = []
+    for slot in available_time or []:
+        if not slot or len(slot) != 2:
+            continue
+        start, end = parse_time(slot[0]), parse_time(slot[1])
+        if start and end and start < end:
+            intervals.append((start, end))
+    return intervals
+
+
+def availability_bitsets(available_days, available_time):
+    # Bit n of each weekday covers minutes [n*15, n*15+15), only slots fully inside a range count
+    day_prefixes = {str(day).lower()[:3] for day in available_days or []}
+    time_bits = 0
+    for start, end in available_intervals(available_time):
+        first = -(-(start.hour * 60 + start.minute) // SLOT_MINUTES)
+        last = (end.hour * 60 + end.minute) // SLOT_MINUTES
+        if last > first:
+            time_bits |= ((1 << (last - first)) - 1) << first
+    if not available_time:
+        time_bits = FULL_DAY
+    return [time_bits if day[:3] in day_prefixes else 0 for day in WEEKDAYS]
+
+
+def fill_trainer_availability(apps, schema_editor):
+    User = apps.get_model('frontline_backend', 'User')
+    TrainerAvailability = apps.get_model('frontline_backend', 'TrainerAvailability')
+    TrainerAvailability.objects.bulk_create([
+        TrainerAvailability(
+            trainer_id=user.id,
+            day_slots=[format(bits, 'x') for bits in availability_bitsets(user.available_days, user.available_time)],
+        )
+        for user in User.objects.only('id', 'available_days', 'available_time').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0030_trainerslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerAvailability',
+            fields=[
+                ('trainer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability_index', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('day_slots', models.JSONField(default=list)),
+            ],
+        ),
+        migrations.RunPython(fill_trainer_availability, migrations.RunPython.noop),
+    ]
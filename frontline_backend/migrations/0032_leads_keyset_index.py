@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0031_traineravailability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leads',
+            index=models.Index(fields=['sales_id', 'id'], name='leads_sales_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:32
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the first row per (client, workout_date), the one the views have always read
+    ClienAttendanceUpdates = apps.get_model('frontline_backend', 'ClienAttendanceUpdates')
+    duplicates = (
+        ClienAttendanceUpdates.objects.exclude(workout_date=None)
+        .values('client_id', 'workout_date')
+        .annotate(first_id=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        ClienAttendanceUpdates.objects.filter(
+            client_id=duplicate['client_id'], workout_date=duplicate['workout_date']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0033_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='consulationschedules',
+            index=models.Index(fields=['user', 'status', 'datetime'], name='consultation_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulationschedules',
+            index=models.Index(fields=['client', 'user', 'datetime'], name='consultation_client_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leads',
+            index=models.Index(fields=['sales_id', 'follow_up_date'], name='leads_sales_follow_up_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='programclient',
+            index=models.Index(fields=['client', 'status'], name='programclient_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyworkoutupdates',
+            index=models.Index(fields=['client', 'week_no'], name='weekly_client_week_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='clienattendanceupdates',
+            constraint=models.UniqueConstraint(fields=('client', 'workout_date'), name='unique_client_attendance_date'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0035_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leadsfollowup',
+            index=models.Index(fields=['sales', 'status', 'follow_up_date'], name='followup_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+def seed_role_sequences(apps, schema_editor):
+    # Continue after the highest number already issued per prefix, FF<prefix><number>
+    User = apps.get_model('frontline_backend', 'User')
+    RoleSequence = apps.get_model('frontline_backend', 'RoleSequence')
+    last_values = {}
+    for user_id in User.objects.filter(user_id__startswith='FF').values_list('user_id', flat=True).iterator():
+        prefix, number = user_id[2:4], user_id[4:]
+        if number.isdigit():
+            last_values[prefix] = max(last_values.get(prefix, 0), int(number))
+    RoleSequence.objects.bulk_create([
+        RoleSequence(prefix=prefix, last_value=last_value) for prefix, last_value in last_values.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0036_followup_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoleSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=4, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_role_sequences, migrations.RunPython.noop),
+    ]
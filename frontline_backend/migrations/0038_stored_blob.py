@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:41
+
+import frontline_backend.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0037_role_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='contract',
+            field=models.FileField(null=True, storage=frontline_backend.storage.ContentAddressedStorage(), upload_to='contracts/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='resume',
+            field=models.FileField(null=True, storage=frontline_backend.storage.ContentAddressedStorage(), upload_to='resumes/'),
+        ),
+    ]
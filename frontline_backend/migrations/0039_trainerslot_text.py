@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from datetime import datetime
+from django.db import migrations, models
+
+# Frozen copy of frontline_backend.timetable's slot parsing as of this migration
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p']
+
+
+def parse_time(value):
+    if not isinstance(value, str):
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip().upper(), time_format).time()
+        except ValueError:
+            continue
+    return None
+
+
+def rebuild_trainer_slots(apps, schema_editor):
+    # Slots with unreadable or overnight times were skipped before, now they are kept without times
+    ProgramClient = apps.get_model('frontline_backend', 'ProgramClient')
+    TrainerSlot = apps.get_model('frontline_backend', 'TrainerSlot')
+    slots = []
+    program_clients = ProgramClient.objects.filter(status='active', trainer__isnull=False).select_related('program')
+    for program_client in program_clients.iterator():
+        for day in range(7):
+            if program_client.workout_days_mask & (1 << day):
+                for slot in program_client.preferred_time or []:
+                    if not slot or len(slot) != 2:
+                        continue
+                    start, end = parse_time(slot[0]), parse_time(slot[1])
+                    if not (start and end and start < end):
+                        start = end = None
+                    slots.append(TrainerSlot(
+                        trainer_id=program_client.trainer_id,
+                        program_client_id=program_client.id,
+                        program_id=program_client.program_id,
+                        client_id=program_client.client_id,
+                        program_name=program_client.program.name,
+                        day=day,
+                        start_text=str(slot[0])[:50],
+                        end_text=str(slot[1])[:50],
+                        start_time=start,
+                        end_time=end,
+                    ))
+    TrainerSlot.objects.all().delete()
+    TrainerSlot.objects.bulk_create(slots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0038_stored_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainerslot',
+            name='end_text',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='trainerslot',
+            name='start_text',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='trainerslot',
+            name='end_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='trainerslot',
+            name='start_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.RunPython(rebuild_trainer_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:04
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontline_backend', '0039_trainerslot_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('frontline_backend.user',),
+        ),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
-from .constants import GENDER_CHOICES, STATUS_CHOICES, CLIENT_STATUS_CHOICES
+from django.db import connections, models, transaction
+from django.db.models import Prefetch, F, Max
+from django.core.exceptions import ValidationError
+from .constants import GENDER_CHOICES, STATUS_CHOICES, CLIENT_STATUS_CHOICES, ROLE_PREFIXES
+from .weekdays import WEEKDAYS, weekday_mask
+from .timetable import parse_time_slots, raw_time_slots, read_time_slot, availability_bitsets
+from .storage import blob_storage
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 # Create your models here.
@@ -17,6 +22,12 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email, password, **extra_fields)
+
+    def with_roles(self):
+        # Loads every user's roles in one extra query, read by the serializers via prefetched_roles
+        return self.get_queryset().prefetch_related(
+            Prefetch('userrole_set', queryset=UserRole.objects.select_related('role'), to_attr='prefetched_roles')
+        )
     
 class User(AbstractBaseUser, PermissionsMixin):
     user_id = models.CharField(max_length=10, unique=True, null=True, blank=True)
@@ -24,7 +35,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     phone = models.CharField(max_length=15, null=False)
     email = models.EmailField(unique=True, null=False)
     password = models.CharField(max_length=128, null=False)
-    resume = models.FileField(upload_to='resumes/', null=True)
+    resume = models.FileField(upload_to='resumes/', null=True, storage=blob_storage)
     address = models.TextField(null=True)
     state = models.CharField(max_length=50, null=True)
     country = models.CharField(max_length=50, null=False)  # Allow null
@@ -34,7 +45,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     joining_date = models.DateField(null=True)
     available_time = models.JSONField(null=True)
     available_days = models.JSONField(null=True)  # e.g., ['mon', 'tue']
-    contract = models.FileField(upload_to='contracts/', null=True)
+    contract = models.FileField(upload_to='contracts/', null=True, storage=blob_storage)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', null=True)
     language = models.JSONField(null=True)  # e.g., ['en', 'hi']
 
@@ -48,7 +59,64 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.name or self.email
+
+class TokenUser(User):
+    # request.user as built from JWT claims by StatelessJWTAuthentication. Fields outside the token are
+    # deferred and the claims can be up to a token lifetime old, so it is never written back.
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError('A user built from token claims is read-only, load it with User.objects.get() to change it')
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('A user built from token claims is read-only, load it with User.objects.get() to delete it')
     
+class TrainerAvailability(models.Model):
+    # Per-day bitsets of free 15-minute slots precomputed from User.available_days/available_time
+    trainer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='availability_index')
+    day_slots = models.JSONField(default=list)  # 7 hex strings, Monday first
+
+    def __str__(self):
+        return f"Availability of {self.trainer}"
+
+    @property
+    def bitsets(self):
+        return [int(value, 16) for value in self.day_slots] or [0] * len(WEEKDAYS)
+
+    @classmethod
+    def refresh_for(cls, user):
+        bitsets = availability_bitsets(user.available_days, user.available_time, WEEKDAYS)
+        cls.objects.update_or_create(trainer=user, defaults={'day_slots': [format(bits, 'x') for bits in bitsets]})
+
+class StoredBlob(models.Model):
+    # One row per file in blob_storage, refcount = user file fields pointing at it
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} x{self.refcount}"
+
+    @classmethod
+    def retain(cls, name):
+        blob, created = cls.objects.get_or_create(name=name, defaults={'size': blob_storage.size(name)})
+        cls.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+
+    @classmethod
+    def release(cls, name):
+        # The file goes once nothing references it, after commit so a rollback keeps it
+        cls.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        if not cls.objects.filter(name=name, refcount=0).delete()[0]:
+            return
+
+        def delete_file():
+            # An identical upload may have retained the blob again in the meantime
+            if not cls.objects.filter(name=name).exists():
+                blob_storage.delete(name)
+        transaction.on_commit(delete_file)
+
 class Role(models.Model):
     rolename = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)
@@ -56,6 +124,25 @@ class Role(models.Model):
     def __str__(self):
         return self.rolename
     
+class RoleSequence(models.Model):
+    # Last staff number handed out per user_id prefix, user_id is FF<prefix><number>
+    prefix = models.CharField(max_length=4, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}:{self.last_value}"
+
+    @classmethod
+    def next_user_ids(cls, rolename, count=1):
+        # Reserve `count` consecutive numbers with one UPDATE, the row stays locked until the
+        # surrounding transaction ends, so concurrent signups queue instead of sharing a number
+        prefix = ROLE_PREFIXES.get(rolename.lower(), 'XX')
+        with transaction.atomic():
+            cls.objects.get_or_create(prefix=prefix)
+            cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + count)
+            last = cls.objects.filter(prefix=prefix).values_list('last_value', flat=True).get()
+        return [f"FF{prefix}{str(number).zfill(2)}" for number in range(last - count + 1, last + 1)]
+
 class UserRole(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     role = models.ForeignKey(Role, on_delete=models.CASCADE)
@@ -88,6 +175,7 @@ class Program(models.Model):
     group_trainer_level3 = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='group_trainer_3_programs')
     
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -104,12 +192,78 @@ class Client(models.Model):
     workout_start_date = models.DateField(null=True, blank=True)
     diet_first_consultation = models.IntegerField(default=False)
     trainer_first_consultation = models.IntegerField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
 
     def __str__(self):
         return self.name
     
 
+# ProgramClient columns the TrainerSlot rows are built from
+SLOT_FIELDS = {
+    'workout_days', 'workout_days_mask', 'preferred_time', 'status',
+    'trainer', 'trainer_id', 'program', 'program_id', 'client', 'client_id',
+}
+
+class ProgramClientQuerySet(models.QuerySet):
+    # save() keeps workout_days_mask in step with workout_days and post_save rebuilds the TrainerSlot
+    # rows, these cover the writes that skip both
+
+    def update(self, **kwargs):
+        # bulk_update() comes through here with both fields already set
+        if 'workout_days' in kwargs and 'workout_days_mask' not in kwargs:
+            if not isinstance(kwargs['workout_days'], (list, tuple, type(None))):
+                raise TypeError('workout_days must be a list of day names, the mask cannot follow an expression')
+            kwargs['workout_days_mask'] = weekday_mask(kwargs['workout_days'])
+        if not SLOT_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # Read the rows before the update can move them out of the filter
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            self.model.objects.using(self.db).filter(pk__in=pks).sync_trainer_slots()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.workout_days_mask = weekday_mask(obj.workout_days)
+        with transaction.atomic(using=self.db):
+            # Rows skipped or upserted on conflict come back without a primary key
+            returns_pks = connections[self.db].features.can_return_rows_from_bulk_insert and not (
+                kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')
+            )
+            if not returns_pks:
+                last_pk = self.model.objects.using(self.db).aggregate(last=Max('pk'))['last'] or 0
+            created = super().bulk_create(objs, *args, **kwargs)
+            if returns_pks:
+                new_rows = self.model.objects.using(self.db).filter(pk__in=[obj.pk for obj in created if obj.pk])
+            else:
+                # e.g. MySQL, which does not hand back the new primary keys. Rebuilding is idempotent,
+                # so also covering rows other transactions inserted meanwhile is harmless. Rows an
+                # update_conflicts upsert changed in place are not covered.
+                new_rows = self.model.objects.using(self.db).filter(pk__gt=last_pk)
+            new_rows.sync_trainer_slots()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # TrainerSlot rows are rebuilt by the update() each batch runs
+        if 'workout_days' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.workout_days_mask = weekday_mask(obj.workout_days)
+            fields = [*fields, 'workout_days_mask']
+        with transaction.atomic(using=self.db):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def sync_trainer_slots(self):
+        # Rebuild the TrainerSlot rows of these bookings, ProgramClient.sync_trainer_slots for many
+        program_clients = list(self.select_related('program'))
+        TrainerSlot.objects.using(self.db).filter(program_client__in=[program_client.pk for program_client in program_clients]).delete()
+        TrainerSlot.objects.using(self.db).bulk_create(
+            [slot for program_client in program_clients for slot in program_client.build_trainer_slots()], batch_size=1000
+        )
+
 class ProgramClient(models.Model):
  
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='programs')
@@ -118,6 +272,9 @@ class ProgramClient(models.Model):
     preferred_time = models.JSONField(blank=True, null=True)
     preferred_group_time = models.CharField(max_length=100, blank=True, null=True)
     workout_days = models.JSONField(null=True, blank=True)
+    # Kept in sync with workout_days by save() and ProgramClientQuerySet's update/bulk_create/bulk_update,
+    # which also rebuild the TrainerSlot rows. Raw SQL writes must set it and run sync_trainer_slots().
+    workout_days_mask = models.PositiveSmallIntegerField(default=0, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     trainer = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -133,10 +290,108 @@ class ProgramClient(models.Model):
         blank=True,
         related_name='dietitian_program_clients'
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProgramClientQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trainer', 'status', 'workout_days_mask'], name='programclient_trainer_days_idx'),
+            models.Index(fields=['client', 'status'], name='programclient_client_idx'),
+        ]
+
+    def clean(self):
+        # Reject bookings that overlap the trainer's existing sessions
+        if self.trainer_id and self.status == 'active':
+            conflicts = self.trainer_conflicts()
+            if conflicts:
+                raise ValidationError({'preferred_time': 'Trainer already has a session at %s' % ', '.join(
+                    f"{WEEKDAYS[slot.day]} {slot.start_time:%H:%M}-{slot.end_time:%H:%M} ({slot.client.name})" for slot in conflicts
+                )})
+
+    def trainer_conflicts(self):
+        mask = weekday_mask(self.workout_days)
+        days = [index for index in range(len(WEEKDAYS)) if mask & (1 << index)]
+        intervals = parse_time_slots(self.preferred_time)
+        if not days or not intervals:
+            return []
+        slots = TrainerSlot.objects.overlapping(self.trainer_id, days, intervals).select_related('client')
+        if self.pk:
+            slots = slots.exclude(program_client_id=self.pk)
+        # Group members share their program's session, only other programs count as a clash
+        if self.program_type and 'group' in self.program_type.lower():
+            slots = slots.exclude(program_id=self.program_id)
+        return list(slots)
+
+    def build_trainer_slots(self):
+        # Unsaved TrainerSlot rows for this booking, empty unless it's an active trainer session
+        if not self.trainer_id or self.status != 'active':
+            return []
+        slots = []
+        for index in range(len(WEEKDAYS)):
+            if self.workout_days_mask & (1 << index):
+                for slot in raw_time_slots(self.preferred_time):
+                    # Unreadable slots are kept for the schedule but without times, so they never match an overlap
+                    start, end = read_time_slot(slot) or (None, None)
+                    slots.append(TrainerSlot(
+                        trainer_id=self.trainer_id,
+                        program_client=self,
+                        program_id=self.program_id,
+                        client_id=self.client_id,
+                        program_name=self.program.name,
+                        day=index,
+                        start_text=str(slot[0])[:50],
+                        end_text=str(slot[1])[:50],
+                        start_time=start,
+                        end_time=end,
+                    ))
+        return slots
+
+    def sync_trainer_slots(self):
+        TrainerSlot.objects.filter(program_client=self).delete()
+        TrainerSlot.objects.bulk_create(self.build_trainer_slots())
+
+    def save(self, *args, **kwargs):
+        self.workout_days_mask = weekday_mask(self.workout_days)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'workout_days' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'workout_days_mask'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.client.name} - {self.program.name}"
 
+class TrainerSlotQuerySet(models.QuerySet):
+    def overlapping(self, trainer_id, days, intervals):
+        # Sessions on any of the days (WEEKDAYS indexes) intersecting any (start, end) interval
+        overlap = models.Q()
+        for start_time, end_time in intervals:
+            overlap |= models.Q(start_time__lt=end_time, end_time__gt=start_time)
+        return self.filter(overlap, trainer_id=trainer_id, day__in=days)
+
+class TrainerSlot(models.Model):
+    # Materialized trainer timetable, one row per (day, time slot) of each active ProgramClient
+    trainer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trainer_slots')
+    program_client = models.ForeignKey(ProgramClient, on_delete=models.CASCADE, related_name='trainer_slots')
+    program = models.ForeignKey(Program, on_delete=models.CASCADE)
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    program_name = models.CharField(max_length=255)
+    day = models.PositiveSmallIntegerField()  # index into WEEKDAYS, Monday=0
+    start_text = models.CharField(max_length=50, default='')  # as entered in preferred_time
+    end_text = models.CharField(max_length=50, default='')
+    start_time = models.TimeField(null=True)  # None when start_text/end_text can't be read or cross midnight
+    end_time = models.TimeField(null=True)
+
+    objects = TrainerSlotQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trainer', 'day', 'start_time', 'end_time'], name='trainerslot_interval_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trainer} {WEEKDAYS[self.day]} {self.start_time}-{self.end_time}"
+
 class ConsulationSchedules(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -146,6 +401,12 @@ class ConsulationSchedules(models.Model):
     status = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'datetime'], name='consultation_user_status_idx'),
+            models.Index(fields=['client', 'user', 'datetime'], name='consultation_client_user_idx'),
+        ]
+
     def __str__(self):
         return f"Consultation for {self.client.name} with {self.user.username} on {self.datetime}"
 
@@ -174,6 +435,12 @@ class WeeklyWorkoutUpdates(models.Model):
     week_workout_days = models.JSONField(null=True, blank=True)
     status = models.BooleanField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'week_no'], name='weekly_client_week_idx'),
+        ]
 
     def __str__(self):
         return f"Weekly updates of  {self.client.name}  on {self.created_at}"
@@ -189,6 +456,7 @@ class WeeklyWorkoutwithDaysUpdates(models.Model):
     workout_sets = models.IntegerField(default=1, blank=True)
     workout_reps = models.IntegerField(default=1, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Weekly updates of  {self.client.name}  on {self.created_at}"
@@ -199,10 +467,39 @@ class ClienAttendanceUpdates(models.Model):
     workout_date = models.DateField(null=True)
     status = models.BooleanField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # One attendance row per client and day, also serves (client, workout_date) lookups
+            models.UniqueConstraint(fields=['client', 'workout_date'], name='unique_client_attendance_date'),
+        ]
 
     def __str__(self):
         return f"Attendance of   {self.client.name}  marked on {self.created_at}"
     
+class AttendanceRollup(models.Model):
+    # Per client, trainer and month totals, kept up to date by rollups.refresh_rollups()
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    trainer = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    scheduled_sessions = models.PositiveIntegerField(default=0)
+    attended_sessions = models.PositiveIntegerField(default=0)
+    last_attended = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'trainer', 'year', 'month'], name='unique_attendance_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['trainer', 'year', 'month'], name='rollup_trainer_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client.name} {self.year}-{self.month:02d}: {self.attended_sessions}/{self.scheduled_sessions}"
+
 class Country(models.Model):
     country_code = models.CharField(max_length=100, null=False)
     country_name = models.CharField(max_length=100, null=False)
@@ -226,6 +523,13 @@ class Leads(models.Model):
     follow_up_date = models.DateField(null=True)
     notes = models.CharField(max_length=255, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sales_id', 'id'], name='leads_sales_keyset_idx'),
+            models.Index(fields=['sales_id', 'follow_up_date'], name='leads_sales_follow_up_idx'),
+        ]
 
     def __str__(self):
         return self.name or self.email
@@ -236,6 +540,12 @@ class LeadsFollowup(models.Model):
     follow_up_date = models.DateField(null=True)
     status = models.BooleanField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sales', 'status', 'follow_up_date'], name='followup_queue_idx'),
+        ]
 
     def __str__(self):
         return self.follow_up_date or self.status
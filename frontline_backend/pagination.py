@@ -0,0 +1,29 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework import status
+from .caching import cached_reference
+
+
+class KeysetPagination(CursorPagination):
+    # Seeks with WHERE id > cursor instead of OFFSET, so every page costs the same
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+
+def list_response(request, queryset, serializer_class, ordering='id', cache_group=None, cache_key='list'):
+    # Pagination is opt-in: only requests sending ?cursor= or ?page_size= get the
+    # {next, previous, results} shape, older app builds keep receiving the full list
+    if 'cursor' not in request.query_params and 'page_size' not in request.query_params:
+        if cache_group:
+            data = cached_reference(cache_group, cache_key, lambda: list(serializer_class(queryset, many=True).data))
+            return Response(data, status=status.HTTP_200_OK)
+        serializer = serializer_class(queryset, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    paginator = KeysetPagination()
+    paginator.ordering = ordering
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
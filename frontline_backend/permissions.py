@@ -0,0 +1,15 @@
+from rest_framework.permissions import BasePermission
+from .serializers import get_user_roles
+
+MANAGEMENT_ROLES = {'admin', 'manager'}
+
+
+class IsManagement(BasePermission):
+    # Staff/superusers, or users holding the admin or manager role
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff or user.is_superuser:
+            return True
+        return any(user_role.role.rolename.lower() in MANAGEMENT_ROLES for user_role in get_user_roles(user))
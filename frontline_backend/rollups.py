@@ -0,0 +1,83 @@
+from collections import defaultdict
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
+from .calendars import month_range
+from .models import AttendanceRollup, ClienAttendanceUpdates, WeeklyWorkoutUpdates
+
+KEY_BATCH_SIZE = 500
+
+
+def month_keys(client_id, dates):
+    # (client_id, year, month) keys touched by the given dates
+    return {(client_id, value.year, value.month) for value in dates if value}
+
+
+def week_keys(weeks):
+    keys = set()
+    for week in weeks:
+        keys |= month_keys(week.client_id, [week.week_start_date, week.week_end_date])
+    return keys
+
+
+def refresh_rollups(keys):
+    # Recompute the rollup rows of just these (client_id, year, month) keys from the raw tables.
+    # Each key covers at most one month of one client, so this stays cheap however much history exists.
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), KEY_BATCH_SIZE):
+        _refresh_batch(keys[start:start + KEY_BATCH_SIZE])
+
+
+def _refresh_batch(keys):
+    client_ids = {client_id for client_id, _, _ in keys}
+    first_day = min(month_range(year, month)[0] for _, year, month in keys)
+    last_day = max(month_range(year, month)[1] for _, year, month in keys)
+    wanted = set(keys)
+    totals = defaultdict(lambda: {'scheduled_sessions': 0, 'attended_sessions': 0, 'last_attended': None})
+
+    weeks = WeeklyWorkoutUpdates.objects.filter(
+        client_id__in=client_ids, week_start_date__lte=last_day, week_end_date__gte=first_day
+    ).values_list('client_id', 'trainer_id_id', 'week_workout_dates')
+    for client_id, trainer_id, workout_dates in weeks:
+        for value in workout_dates or []:
+            workout_date = datetime.strptime(value, '%Y-%m-%d').date()
+            if (client_id, workout_date.year, workout_date.month) in wanted:
+                totals[(client_id, trainer_id, workout_date.year, workout_date.month)]['scheduled_sessions'] += 1
+
+    attendances = ClienAttendanceUpdates.objects.filter(
+        client_id__in=client_ids, workout_date__range=(first_day, last_day), status=True
+    ).values_list('client_id', 'trainer_id_id', 'workout_date')
+    for client_id, trainer_id, workout_date in attendances:
+        if (client_id, workout_date.year, workout_date.month) in wanted:
+            total = totals[(client_id, trainer_id, workout_date.year, workout_date.month)]
+            total['attended_sessions'] += 1
+            if not total['last_attended'] or workout_date > total['last_attended']:
+                total['last_attended'] = workout_date
+
+    stale = Q()
+    for client_id, year, month in keys:
+        stale |= Q(client_id=client_id, year=year, month=month)
+    with transaction.atomic():
+        AttendanceRollup.objects.filter(stale).delete()
+        AttendanceRollup.objects.bulk_create([
+            AttendanceRollup(client_id=client_id, trainer_id=trainer_id, year=year, month=month, **total)
+            for (client_id, trainer_id, year, month), total in totals.items()
+        ])
+
+
+def rebuild_rollups(batch_size=KEY_BATCH_SIZE):
+    # Full rebuild: every month touched by a planned week or an attendance row
+    keys = set()
+    for client_id, start_date, end_date in WeeklyWorkoutUpdates.objects.values_list(
+        'client_id', 'week_start_date', 'week_end_date'
+    ).iterator(chunk_size=5000):
+        keys |= month_keys(client_id, [start_date, end_date])
+    for client_id, workout_date in ClienAttendanceUpdates.objects.values_list(
+        'client_id', 'workout_date'
+    ).iterator(chunk_size=5000):
+        keys |= month_keys(client_id, [workout_date])
+
+    with transaction.atomic():
+        AttendanceRollup.objects.all().delete()
+        refresh_rollups(keys)
+    return len(keys)
@@ -0,0 +1,91 @@
+import calendar
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from .models import ProgramClient, WeeklyWorkoutUpdates
+from .weekdays import WEEKDAYS, weekday_mask
+from .rollups import refresh_rollups, week_keys
+
+def week_end_date(week_start_date):
+    # Weeks run up to and including the next Saturday
+    return week_start_date + timedelta(days=(calendar.SATURDAY - week_start_date.weekday()) % 7)
+
+
+def build_week(client_id, trainer_id, week_no, week_start_date, mask, no_of_days):
+    # Unsaved WeeklyWorkoutUpdates for the week starting at week_start_date
+    week_end = week_end_date(week_start_date)
+    week_workout_days = []
+    week_workout_dates = []
+    current_date = week_start_date
+    while current_date <= week_end:
+        if mask & (1 << current_date.weekday()):
+            week_workout_days.append(WEEKDAYS[current_date.weekday()])
+            week_workout_dates.append(current_date.strftime('%Y-%m-%d'))
+        current_date += timedelta(days=1)
+
+    return WeeklyWorkoutUpdates(
+        client_id=client_id,
+        trainer_id_id=trainer_id,
+        week_no=week_no,
+        no_of_days=no_of_days,
+        week_no_of_days=len(week_workout_days),
+        week_start_date=week_start_date,
+        week_end_date=week_end,
+        week_workout_days=week_workout_days,
+        week_workout_dates=week_workout_dates,
+        status=False
+    )
+
+
+def build_weeks(client_id, trainer_id, first_week_no, first_start_date, workout_days, weeks=1):
+    # `weeks` consecutive weeks, each starting the day after the previous one ends
+    mask = weekday_mask(workout_days)
+    no_of_days = len(workout_days or [])
+    plan = []
+    week_start = first_start_date
+    for offset in range(weeks):
+        week = build_week(client_id, trainer_id, first_week_no + offset, week_start, mask, no_of_days)
+        plan.append(week)
+        week_start = week.week_end_date + timedelta(days=1)
+    return plan
+
+
+def plan_roster_weeks(until_date):
+    # Unsaved weeks needed so every active client with a started plan is covered up to until_date.
+    # Clients without a first week are skipped, that one is created at the second consultation.
+    latest_week = WeeklyWorkoutUpdates.objects.filter(client=OuterRef('client')).order_by('-week_no', '-id')
+    program_clients = ProgramClient.objects.filter(
+        status='active',
+        client__workout_start_date__isnull=False,
+    ).annotate(
+        last_week_no=Subquery(latest_week.values('week_no')[:1]),
+        last_week_end=Subquery(latest_week.values('week_end_date')[:1]),
+    ).filter(last_week_end__lt=until_date).order_by('client_id', 'id')
+
+    # Same program pick as ProgramClient.objects.filter(client=..., status="active").last()
+    latest_program = {}
+    for program_client in program_clients:
+        latest_program[program_client.client_id] = program_client
+
+    plan = []
+    for program_client in latest_program.values():
+        if not program_client.trainer_id:
+            continue
+        mask = program_client.workout_days_mask
+        no_of_days = len(program_client.workout_days or [])
+        week_no = program_client.last_week_no
+        week_start = program_client.last_week_end + timedelta(days=1)
+        while week_start <= until_date:
+            week_no += 1
+            week = build_week(program_client.client_id, program_client.trainer_id, week_no, week_start, mask, no_of_days)
+            plan.append(week)
+            week_start = week.week_end_date + timedelta(days=1)
+    return plan
+
+
+def create_weeks(weeks, batch_size=1000):
+    with transaction.atomic():
+        created = WeeklyWorkoutUpdates.objects.bulk_create(weeks, batch_size=batch_size)
+        # New weeks add scheduled sessions to their months
+        refresh_rollups(week_keys(weeks))
+    return created
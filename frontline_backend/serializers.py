@@ -1,11 +1,50 @@
 # users/serializers.py
 
 from rest_framework import serializers
+from collections import Counter
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.db.models import Count
-from .models import User, UserRole, Role, Program, Client, ProgramClient, ConsulationSchedules, TrainerConsultationDetails, WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, Country, Leads, LeadsFollowup
-from dj_rest_auth.serializers import UserDetailsSerializer
+from .models import User, UserRole, Role, RoleSequence, Program, Client, ProgramClient, ConsulationSchedules, TrainerConsultationDetails, WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, Country, Leads, LeadsFollowup
+from dj_rest_auth.serializers import PasswordChangeSerializer, UserDetailsSerializer
 from django.utils.timezone import localtime
-from .constants import ROLE_PREFIXES 
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import add_identity_claims, stored_user
+from .weekdays import weekday_mask
+
+def create_staff(items):
+    """
+    Create users with their role and staff user_id. Numbers come from RoleSequence, one counter
+    update per role for the whole batch, inside the same transaction as the user inserts.
+    """
+    with transaction.atomic():
+        roles = Role.objects.in_bulk({item['role_id'] for item in items})
+        missing = sorted({item['role_id'] for item in items} - roles.keys())
+        if missing:
+            raise serializers.ValidationError({'role_id': f"Unknown role {', '.join(map(str, missing))}"})
+
+        counts = Counter(item['role_id'] for item in items)
+        user_ids = {
+            role_id: iter(RoleSequence.next_user_ids(roles[role_id].rolename, counts[role_id]))
+            for role_id in sorted(counts)  # same lock order for concurrent batches
+        }
+        users, user_roles = [], []
+        for item in items:
+            item = dict(item)
+            role = roles[item.pop('role_id')]
+            password = item.pop('password')
+            user = User.objects.create_user(password=password, user_id=next(user_ids[role.id]), **item)
+            users.append(user)
+            user_roles.append(UserRole(user=user, role=role))
+        UserRole.objects.bulk_create(user_roles)
+    return users
+
+class UserBulkCreateSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        return create_staff(validated_data)
 
 class UserCreateSerializer(serializers.ModelSerializer):
     role_id = serializers.IntegerField(write_only=True)  # coming from frontend
@@ -20,26 +59,10 @@ class UserCreateSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'password': {'write_only': True}
         }
+        list_serializer_class = UserBulkCreateSerializer
 
     def create(self, validated_data):
-        role_id = validated_data.pop('role_id')
-        password = validated_data.pop('password')
-        user = User.objects.create_user(password=password, **validated_data)
-
-        # Assign role
-        role = Role.objects.get(id=role_id)
-        UserRole.objects.create(user=user, role=role)
-
-        # Generate user_id
-        existing_count = UserRole.objects.filter(role=role).count()
-
-        # Step 5: Generate user_id
-        prefix = ROLE_PREFIXES.get(role.rolename.lower(), 'XX')
-        serial_number = str(existing_count).zfill(2)  # e.g., 00, 01, 02...
-        user.user_id = f"FF{prefix}{serial_number}"
-        user.save()
-
-        return user
+        return create_staff([validated_data])[0]
 
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -52,6 +75,16 @@ class UserRoleSerializer(serializers.ModelSerializer):
         model = UserRole
         fields = ['role']
 
+def get_user_roles(user):
+    # Use the roles from the access token or from User.objects.with_roles() when present, else fall back to a query
+    token_roles = getattr(user, 'token_roles', None)
+    if token_roles is not None:
+        return [UserRole(user=user, role=Role(id=role['id'], rolename=role['rolename'])) for role in token_roles]
+    user_roles = getattr(user, 'prefetched_roles', None)
+    if user_roles is None:
+        user_roles = UserRole.objects.filter(user=user).select_related('role')
+    return user_roles
+
 class UserSerializer(serializers.ModelSerializer):
     roles = serializers.SerializerMethodField()
     class Meta:
@@ -59,18 +92,32 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'email', 'phone', 'roles', 'user_id']
 
     def get_roles(self, obj):
-        user_roles = UserRole.objects.filter(user=obj).select_related('role')
-        return UserRoleSerializer(user_roles, many=True).data
+        return UserRoleSerializer(get_user_roles(obj), many=True).data
+
+class StoredUserUpdateMixin:
+    # request.user may be a read-only TokenUser built from Bearer token claims, write to its stored row
+    def update(self, instance, validated_data):
+        return super().update(stored_user(instance), validated_data)
 
-class CustomUserDetailsSerializer(serializers.ModelSerializer):
+class CustomUserDetailsSerializer(StoredUserUpdateMixin, serializers.ModelSerializer):
     roles = serializers.SerializerMethodField()
     class Meta:
         model = User
         fields = ['id', 'email', 'name', 'roles']
 
     def get_roles(self, obj):
-        user_roles = UserRole.objects.filter(user=obj).select_related('role')
-        return UserRoleSerializer(user_roles, many=True).data
+        return UserRoleSerializer(get_user_roles(obj), many=True).data
+
+class StoredUserDetailsSerializer(StoredUserUpdateMixin, UserDetailsSerializer):
+    # dj_rest_auth's api/auth/user/, unchanged apart from saving the stored user
+    pass
+
+class StoredUserPasswordChangeSerializer(PasswordChangeSerializer):
+    # dj_rest_auth's api/auth/password/change/, setting the password on the stored user
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.user is not None and self.user.is_authenticated:
+            self.user = stored_user(self.user)
     
 class ProgramCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -105,6 +152,26 @@ class ProgramClientSerializer(serializers.ModelSerializer):
         model = ProgramClient
         fields = ['program', 'preferred_time', 'preferred_group_time', 'status']
 
+class ProgramClientBookingSerializer(serializers.ModelSerializer):
+    # Enrols a client in a program, refusing times that overlap the trainer's other sessions.
+    # Validate and save inside one transaction, the trainer row stays locked until the booking is written.
+
+    class Meta:
+        model = ProgramClient
+        fields = ['id', 'client', 'program', 'program_type', 'preferred_time', 'preferred_group_time', 'workout_days', 'status', 'trainer', 'dietitian']
+
+    def validate(self, attrs):
+        booking = ProgramClient(**{**attrs, 'pk': self.instance.pk if self.instance else None})
+        booking.workout_days_mask = weekday_mask(booking.workout_days)
+        if booking.trainer_id and booking.status == 'active':
+            # Serializes concurrent bookings of this trainer, so two can't both pass the overlap check
+            list(User.objects.select_for_update().filter(pk=booking.trainer_id).values_list('pk'))
+            try:
+                booking.clean()
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.message_dict)
+        return attrs
+
 class NewClientSerializer(serializers.ModelSerializer):
     programs = ProgramClientSerializer(many=True, read_only=True)
 
@@ -154,24 +221,31 @@ class ConsultationScheduleWithClientSerializer(serializers.ModelSerializer):
         return max(obj.no_of_consultation - 1, 0)
     
     def get_last_consultation_datetime(self, obj):
-        last = ConsulationSchedules.objects.filter(
-            client=obj.client,
-            user=obj.user
-        ).order_by('-datetime').first()
-
-        if last and last.datetime:
+        # Annotated by ConsultationScheduleDetails, fall back to a lookup otherwise
+        if hasattr(obj, 'latest_datetime'):
+            last_datetime = obj.latest_datetime
+        else:
+            last = ConsulationSchedules.objects.filter(
+                client=obj.client,
+                user=obj.user
+            ).order_by('-datetime').first()
+            last_datetime = last.datetime if last else None
+
+        if last_datetime:
             # Convert to local time before formatting
-            local_dt = localtime(last.datetime)
+            local_dt = localtime(last_datetime)
             return local_dt.strftime('%d-%m-%Y %H:%M')
 
         return None
 
     def get_last_consultation_user_id(self, obj):
+        if hasattr(obj, 'previous_user_id'):
+            return obj.previous_user_id or obj.user_id
         last = ConsulationSchedules.objects.filter(
             client=obj.client,
             user=obj.user,
         ).exclude(id=obj.id).order_by('-datetime').first()
-        return last.user.id if last else obj.user.id 
+        return last.user_id if last else obj.user_id
     
 
 class WeeklyWorkoutWithDaysSerializer(serializers.ModelSerializer):
@@ -179,6 +253,27 @@ class WeeklyWorkoutWithDaysSerializer(serializers.ModelSerializer):
         model = WeeklyWorkoutwithDaysUpdates
         fields = '__all__'
 
+class WeeklyWorkoutDayInputSerializer(serializers.Serializer):
+    # One exercise row posted to SaveWeeklyWorkoutUpdatesView, validated with many=True
+    workout_type = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=True)
+    sets = serializers.IntegerField(required=False, allow_null=True)
+    reps = serializers.IntegerField(required=False, allow_null=True)
+    week_no = serializers.IntegerField(required=False, allow_null=True)
+    day = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # The app posts empty form inputs as '', treat them as missing
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value != ''}
+        return super().to_internal_value(data)
+
+class AttendanceEntrySerializer(serializers.Serializer):
+    # One tick mark posted to MarkClientAttendanceBulkView
+    client_id = serializers.IntegerField()
+    workout_date = serializers.DateField()
+    status = serializers.BooleanField(default=True)
+
 class WeeklyWorkoutSerializer(serializers.ModelSerializer):
     daily_workouts = WeeklyWorkoutWithDaysSerializer(many=True, read_only=True)
 
@@ -227,3 +322,25 @@ class LeadsSerializer(serializers.ModelSerializer):
     #         rep[field] = self.fields[field].to_representation(getattr(instance, self.fields[field].source))
     #     return rep
 
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Access/refresh pair carrying the user's identity and role names, see StatelessJWTAuthentication
+    @classmethod
+    def get_token(cls, user):
+        return add_identity_claims(super().get_token(user), user, get_user_roles(user))
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    # Rotates the refresh token and re-reads the user, so role changes reach the claims on the next refresh
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.with_roles().filter(pk=refresh[jwt_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('No active account found for the given token.', 'no_active_account')
+
+        try:
+            refresh.blacklist()
+        except AttributeError:
+            pass  # token_blacklist app not installed
+
+        new_refresh = RoleTokenObtainPairSerializer.get_token(user)
+        return {'access': str(new_refresh.access_token), 'refresh': str(new_refresh)}
@@ -0,0 +1,91 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.core.cache import cache
+from .models import User, UserRole, Role, Country, Program, ProgramClient, TrainerSlot, TrainerAvailability, StoredBlob
+from .caching import bump_version
+from .authentication import auth_state_key
+from .storage import is_blob
+from .middleware import dispatch_to_recorders
+
+
+@receiver(post_save, sender=ProgramClient)
+def sync_program_client_slots(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.sync_trainer_slots()
+
+
+@receiver(post_save, sender=Program)
+def sync_program_slot_names(sender, instance, raw=False, **kwargs):
+    if not raw:
+        TrainerSlot.objects.filter(program=instance).exclude(program_name=instance.name).update(program_name=instance.name)
+
+
+@receiver(post_save, sender=User)
+def refresh_trainer_availability(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Skip saves that can't change availability, e.g. the last_login update on every login
+    if raw or (update_fields is not None and not {'available_days', 'available_time'} & set(update_fields)):
+        return
+    TrainerAvailability.refresh_for(instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserRole)
+def forget_auth_state(sender, instance, **kwargs):
+    # Bearer tokens of this user are checked against the database again on their next request
+    cache.delete(auth_state_key(instance.pk if sender is User else instance.user_id))
+
+
+BLOB_FIELDS = ('resume', 'contract')
+
+
+def blob_names(values):
+    return [name for name in values if is_blob(name)]
+
+
+@receiver(pre_save, sender=User)
+def remember_user_blobs(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Files the row points at before this save, only read when a file field may change
+    instance._stored_blobs = []
+    if raw or instance.pk is None or (update_fields is not None and not set(BLOB_FIELDS) & set(update_fields)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*BLOB_FIELDS).first()
+    instance._stored_blobs = blob_names(previous or [])
+
+
+@receiver(post_save, sender=User)
+def count_user_blobs(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not set(BLOB_FIELDS) & set(update_fields)):
+        return
+    previous = getattr(instance, '_stored_blobs', [])
+    current = blob_names(getattr(instance, field).name for field in BLOB_FIELDS)
+    for name in current:
+        if name in previous:
+            previous.remove(name)
+        else:
+            StoredBlob.retain(name)
+    for name in previous:
+        StoredBlob.release(name)
+
+
+@receiver(post_delete, sender=User)
+def release_user_blobs(sender, instance, **kwargs):
+    for name in blob_names(getattr(instance, field).name for field in BLOB_FIELDS):
+        StoredBlob.release(name)
+
+
+REFERENCE_GROUPS = {Country: 'countries', Role: 'roles', Program: 'programs'}
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Program)
+def invalidate_reference_cache(sender, **kwargs):
+    bump_version(REFERENCE_GROUPS[sender])
+
+
+@receiver(connection_created)
+def install_query_hook(sender, connection, **kwargs):
+    # Lets the instrumentation middlewares see this connection's queries, a no-op outside them
+    if dispatch_to_recorders not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_to_recorders)
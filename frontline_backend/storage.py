@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + '/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once as blobs/<aa>/<sha256><ext>, whatever name it was uploaded
+    under. The upload is hashed while it streams to a temporary file, which is then renamed to its
+    content address, or dropped if that blob is already stored. StoredBlob counts the users
+    referencing each blob.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is the digest, chosen in _save, never a randomised variant
+        return name
+
+    def _save(self, name, content):
+        # The temporary file sits in BLOB_DIR so the final rename stays on one filesystem
+        blob_root = self.path(BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=blob_root, suffix='.part')
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+            digest = digest.hexdigest()
+            name = f"{BLOB_DIR}/{digest[:2]}/{digest}{os.path.splitext(name)[1].lower()}"
+            if self.exists(name):
+                os.remove(tmp_path)
+                return name
+
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Same digest means same bytes, so losing a race with an identical upload is harmless
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+blob_storage = ContentAddressedStorage()
@@ -1,3 +1,1071 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import AsyncRequestFactory, TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from . import async_views, exports, imports, metrics, middleware, views
+from .imports import import_leads
+from .matching import match_trainers
+from .authentication import StatelessJWTAuthentication
+from .rollups import rebuild_rollups
+from .schedules import build_weeks, create_weeks
+from .storage import blob_storage
+from .weekdays import weekday_mask
+from .models import User, Role, UserRole, Program, Client, ProgramClient, ConsulationSchedules, WeeklyWorkoutUpdates, ClienAttendanceUpdates, Country, Leads, LeadsFollowup, WeeklyWorkoutwithDaysUpdates, AttendanceRollup, RoleSequence, StoredBlob, TrainerSlot
 
 # Create your tests here.
+
+
+class QueryRecorder:
+    # connection.execute_wrapper hook keeping each statement with its real params, so it can be EXPLAINed
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def full_scans(sql, params, tables):
+    # Tables from `tables` the plan reads without an index
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            return {table for table in tables for detail in details if detail.startswith(f'SCAN {table}')}
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            # On tiny test tables MySQL may still pick ALL, only fail when no index was usable
+            return {row['table'] for row in rows if row['table'] in tables and row['type'] == 'ALL' and not row['possible_keys']}
+    return set()
+
+
+class HotEndpointData(TestCase):
+    # A trainer with five clients and a sales user with five leads
+
+    @classmethod
+    def setUpTestData(cls):
+        trainer_role = Role.objects.create(rolename='trainer')
+        sales_role = Role.objects.create(rolename='sales')
+        cls.trainer = User.objects.create_user(email='trainer@example.com', password='pw', name='Trainer', phone='1', country='IN')
+        cls.sales = User.objects.create_user(email='sales@example.com', password='pw', name='Sales', phone='1', country='IN')
+        UserRole.objects.create(user=cls.trainer, role=trainer_role)
+        UserRole.objects.create(user=cls.sales, role=sales_role)
+
+        program = Program.objects.create(name='Strength', program_type=['personal'])
+        country = Country.objects.create(country_code='IN', country_name='India')
+        cls.clients = []
+        for index in range(5):
+            client = Client.objects.create(
+                name=f'Client {index}', source='ad', email=f'client{index}@example.com', phone='1',
+                status='converted', new_client=False, workout_start_date=date(2025, 1, 1), trainer_first_consultation=1
+            )
+            cls.clients.append(client)
+            ProgramClient.objects.create(
+                client=client, program=program, status='active', trainer=cls.trainer,
+                workout_days=['Monday', 'Wednesday'], preferred_time=[['10:00', '11:00']]
+            )
+            ConsulationSchedules.objects.create(client=client, user=cls.trainer, no_of_consultation=1, datetime=timezone.now(), type='trainer')
+            WeeklyWorkoutUpdates.objects.create(client=client, trainer_id=cls.trainer, week_start_date=date(2025, 1, 1), week_end_date=date(2025, 1, 4))
+            ClienAttendanceUpdates.objects.create(client=client, trainer_id=cls.trainer, workout_date=date(2025, 1, 1))
+            lead = Leads.objects.create(
+                name=f'Lead {index}', source='ad', sales_id=cls.sales, phone='1', email=f'lead{index}@example.com',
+                country=country, program_name='Strength', follow_up_date=date.today() + timedelta(days=index)
+            )
+            LeadsFollowup.objects.create(lead=lead, sales=cls.sales, follow_up_date=lead.follow_up_date)
+        cls.client_obj = cls.clients[0]
+
+
+class QueryPlanTests(HotEndpointData):
+    # Each hot endpoint must reach its tables through an index, checked on every SELECT it runs
+
+    def assertIndexed(self, user, method, url, tables, data=None):
+        api = APIClient()
+        api.force_authenticate(user)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = getattr(api, method)(url, data, format='json') if data is not None else getattr(api, method)(url)
+        self.assertLess(response.status_code, 400, response.content)
+
+        selects = [(sql, params) for sql, params in recorder.statements if sql.lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects, f'{url} ran no SELECT')
+        for sql, params in selects:
+            scanned = full_scans(sql, params, tables)
+            self.assertFalse(scanned, f'{url} full-scans {sorted(scanned)}:\n{sql}')
+
+    def test_client_list_by_date(self):
+        self.assertIndexed(self.trainer, 'get', '/api/user/clientListbyDate/2025-01-06/', [
+            'frontline_backend_programclient', 'frontline_backend_clienattendanceupdates',
+        ])
+
+    def test_client_list_by_month(self):
+        self.assertIndexed(self.trainer, 'get', f'/api/user/clientListbyMonth/{self.client_obj.id}/2025/1/', [
+            'frontline_backend_programclient', 'frontline_backend_clienattendanceupdates',
+        ])
+
+    def test_mark_client_attendance(self):
+        self.assertIndexed(self.trainer, 'post', '/api/user/markClientAttendance/', [
+            'frontline_backend_clienattendanceupdates',
+        ], data={'client_id': self.client_obj.id, 'workout_date': '2025-01-06'})
+
+    def test_consultation_schedule_list(self):
+        self.assertIndexed(self.trainer, 'get', '/api/user/consulationscheduleList', [
+            'frontline_backend_consulationschedules',
+        ])
+
+    def test_weekly_workout_details(self):
+        self.assertIndexed(self.trainer, 'get', f'/api/user/weekworkoutDetails/{self.client_obj.id}/', [
+            'frontline_backend_weeklyworkoutupdates', 'frontline_backend_weeklyworkoutwithdaysupdates',
+        ])
+
+    def test_trainer_schedule(self):
+        self.assertIndexed(self.trainer, 'get', f'/api/user/availabilityTrainer/{self.trainer.id}/', [
+            'frontline_backend_trainerslot',
+        ])
+
+    def test_leads_list(self):
+        self.assertIndexed(self.sales, 'get', '/api/user/leadsList?page_size=2', [
+            'frontline_backend_leads', 'frontline_backend_leadsfollowup',
+        ])
+
+    def test_followup_queue(self):
+        self.assertIndexed(self.sales, 'get', '/api/user/followupQueue?days=3', [
+            'frontline_backend_leadsfollowup', 'frontline_backend_leads',
+        ])
+
+
+
+class QueryBudgetTests(HotEndpointData):
+    # Endpoints that must run a fixed number of queries whatever their result size
+
+    def get(self, user, url):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_user_list(self):
+        # users, then all their roles
+        with self.assertNumQueries(2):
+            users = self.get(self.trainer, '/api/user/userList')
+        self.assertEqual({user['email']: [item['role']['rolename'] for item in user['roles']] for user in users}, {
+            'trainer@example.com': ['trainer'], 'sales@example.com': ['sales'],
+        })
+
+    def test_users_by_role(self):
+        role = Role.objects.get(rolename='sales')
+        with self.assertNumQueries(2):
+            users = self.get(self.trainer, f'/api/user/byrole/{role.id}/')
+        self.assertEqual([user['email'] for user in users], ['sales@example.com'])
+
+    def test_consultation_schedule_list(self):
+        # consultations with their client and history, then the clients' programs
+        with self.assertNumQueries(2):
+            consultations = self.get(self.trainer, '/api/user/consulationscheduleList')
+        self.assertEqual(len(consultations), 5)
+
+
+
+class WeekdayMaskTests(HotEndpointData):
+    # workout_days_mask must follow workout_days whichever way the row is written
+
+    def masks(self):
+        return set(ProgramClient.objects.filter(trainer=self.trainer).values_list('workout_days_mask', flat=True))
+
+    def test_queryset_update(self):
+        ProgramClient.objects.filter(trainer=self.trainer).update(workout_days=['Tuesday'])
+        self.assertEqual(self.masks(), {weekday_mask(['tuesday'])})
+
+    def test_bulk_update(self):
+        program_clients = list(ProgramClient.objects.filter(trainer=self.trainer))
+        for program_client in program_clients:
+            program_client.workout_days = ['Friday', 'Sunday']
+        ProgramClient.objects.bulk_update(program_clients, ['workout_days'])
+        self.assertEqual(self.masks(), {weekday_mask(['friday', 'sunday'])})
+
+    def test_bulk_create(self):
+        ProgramClient.objects.filter(trainer=self.trainer).delete()
+        program = Program.objects.get()
+        ProgramClient.objects.bulk_create([
+            ProgramClient(client=client, program=program, status='active', trainer=self.trainer, workout_days=['Saturday'])
+            for client in self.clients
+        ])
+        self.assertEqual(self.masks(), {weekday_mask(['saturday'])})
+
+
+class TrainerSlotSyncTests(HotEndpointData):
+    # The materialized timetable must follow ProgramClient writes that bypass save()
+
+    def slots(self):
+        return sorted(TrainerSlot.objects.filter(trainer=self.trainer).values_list('client_id', 'day', 'start_text'))
+
+    def test_update_days(self):
+        ProgramClient.objects.filter(client=self.client_obj).update(workout_days=['Sunday'])
+        self.assertIn((self.client_obj.id, 6, '10:00'), self.slots())
+        self.assertFalse(TrainerSlot.objects.filter(client=self.client_obj, day__in=[0, 2]).exists())
+
+    def test_update_status(self):
+        ProgramClient.objects.filter(client=self.client_obj).update(status='inactive')
+        self.assertFalse(TrainerSlot.objects.filter(client=self.client_obj).exists())
+        self.assertEqual(len(self.slots()), 8)
+
+    def test_update_trainer(self):
+        ProgramClient.objects.filter(trainer=self.trainer).update(trainer=self.sales)
+        self.assertEqual(self.slots(), [])
+        self.assertEqual(TrainerSlot.objects.filter(trainer=self.sales).count(), 10)
+
+    def test_unrelated_update_keeps_slots(self):
+        before = list(TrainerSlot.objects.values_list('id', flat=True))
+        ProgramClient.objects.update(preferred_group_time='morning')
+        self.assertEqual(list(TrainerSlot.objects.values_list('id', flat=True)), before)
+
+    def test_bulk_update(self):
+        program_clients = list(ProgramClient.objects.filter(trainer=self.trainer))
+        for program_client in program_clients:
+            program_client.preferred_time = [['07:00', '08:00']]
+        ProgramClient.objects.bulk_update(program_clients, ['preferred_time'])
+        self.assertEqual({start for _, _, start in self.slots()}, {'07:00'})
+
+    def test_bulk_create(self):
+        ProgramClient.objects.filter(trainer=self.trainer).delete()
+        self.assertEqual(self.slots(), [])
+        program = Program.objects.get()
+        ProgramClient.objects.bulk_create([
+            ProgramClient(client=client, program=program, status='active', trainer=self.trainer,
+                          workout_days=['Saturday'], preferred_time=[['09:00', '10:00']])
+            for client in self.clients
+        ])
+        self.assertEqual(self.slots(), sorted((client.id, 5, '09:00') for client in self.clients))
+
+
+class TrainerBookingTests(HotEndpointData):
+    # The trainer already runs Strength on Mondays and Wednesdays 10:00-11:00 for five clients
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.trainer)
+        self.new_client = Client.objects.create(
+            name='New', source='ad', email='new@example.com', phone='1', status='converted', trainer_first_consultation=1
+        )
+
+    def book(self, preferred_time, days=('Monday',)):
+        return self.api.post('/api/user/programClientCreate', {
+            'client': self.new_client.id, 'program': Program.objects.get().id, 'program_type': 'personal', 'status': 'active',
+            'trainer': self.trainer.id, 'workout_days': list(days), 'preferred_time': preferred_time,
+        }, format='json')
+
+    def test_conflicting_booking_is_rejected(self):
+        response = self.book([['10:30', '11:30']])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('preferred_time', response.json())
+        self.assertFalse(ProgramClient.objects.filter(client=self.new_client).exists())
+
+    def test_free_slot_is_booked(self):
+        response = self.book([['09:00', '10:00']], days=('Monday', 'Friday'))
+        self.assertEqual(response.status_code, 201, response.content)
+        program_client = ProgramClient.objects.get(client=self.new_client)
+        self.assertEqual(program_client.trainer_slots.count(), 2)
+
+    def test_schedule_keeps_slots_as_entered(self):
+        program = Program.objects.get()
+        for index, preferred_time in enumerate([[['23:00', '01:00']], [['after lunch', '']]]):
+            client = Client.objects.create(
+                name='Odd', source='ad', email=f'odd{index}@example.com', phone='1', status='converted', trainer_first_consultation=1
+            )
+            ProgramClient.objects.create(client=client, program=program, status='active', trainer=self.trainer, workout_days=['Tuesday'], preferred_time=preferred_time)
+
+        schedule = self.api.get(f'/api/user/availabilityTrainer/{self.trainer.id}/').json()
+        self.assertEqual(schedule['monday'], [{'start': '10:00', 'end': '11:00', 'program': 'Strength'}] * 5)
+        self.assertEqual(schedule['tuesday'], [
+            {'start': '23:00', 'end': '01:00', 'program': 'Strength', 'error': 'Time slot crosses midnight'},
+            {'start': 'after lunch', 'end': '', 'program': 'Strength', 'error': 'Unreadable time slot'},
+        ])
+
+class TrainerMatchTests(HotEndpointData):
+    # Asking for Mondays and Wednesdays 10:00-11:00, which the fixture trainer already teaches
+
+    def setUp(self):
+        trainer_role = Role.objects.get(rolename='trainer')
+        weekdays = ['mon', 'tue', 'wed', 'thu', 'fri']
+        self.trainer.available_days, self.trainer.available_time = weekdays, ['08:00', '18:00']
+        self.trainer.save()
+        self.loaded = self.add_trainer('loaded', weekdays)
+        self.idle = self.add_trainer('idle', weekdays)
+        self.mondays = self.add_trainer('mondays', ['monday'])
+        # The loaded trainer teaches at another time, which must not count as a clash
+        client = Client.objects.create(name='Tuesday', source='ad', email='tuesday@example.com', phone='1', status='converted')
+        ProgramClient.objects.create(
+            client=client, program=Program.objects.get(), status='active', trainer=self.loaded,
+            workout_days=['Tuesday'], preferred_time=[['12:00', '13:00']]
+        )
+        UserRole.objects.bulk_create([UserRole(user=user, role=trainer_role) for user in (self.loaded, self.idle, self.mondays)])
+
+    def add_trainer(self, name, available_days):
+        return User.objects.create_user(
+            email=f'{name}@example.com', password='pw', name=name, phone='1', country='IN',
+            available_days=available_days, available_time=['08:00', '18:00']
+        )
+
+    def test_ranking(self):
+        api = APIClient()
+        api.force_authenticate(self.sales)
+        with self.assertNumQueries(2):
+            response = api.get('/api/user/matchTrainers/?days=monday,wednesday&start=10:00&end=11:00')
+        self.assertEqual(response.status_code, 200)
+        ranked = {candidate['name']: candidate for candidate in response.json()}
+        # All free and idle first, then the one with more booked time, the partly unavailable one, the fully booked one
+        self.assertEqual(list(ranked), ['idle', 'loaded', 'mondays', 'Trainer'])
+        self.assertEqual([candidate['available'] for candidate in ranked.values()], [True, True, False, False])
+        self.assertEqual(ranked['loaded']['booked_minutes_per_week'], 60)
+        self.assertEqual((ranked['mondays']['free_days'], ranked['mondays']['unavailable_days']), (['monday'], ['wednesday']))
+        self.assertEqual(ranked['Trainer']['busy_days'], ['monday', 'wednesday'])
+        self.assertEqual(ranked['Trainer']['booked_minutes_per_week'], 5 * 2 * 60)
+
+    def test_free_after_the_booked_hour(self):
+        candidates = match_trainers([0, 2], time(11, 0), time(12, 0))
+        trainer = next(candidate for candidate in candidates if candidate['id'] == self.trainer.id)
+        self.assertEqual(trainer['free_days'], ['monday', 'wednesday'])
+
+
+class WorkoutCalendarTests(HotEndpointData):
+    # Clients train on Mondays and Wednesdays from 2025-01-01, attended that first day
+
+    def get(self, url):
+        api = APIClient()
+        api.force_authenticate(self.trainer)
+        return api.get(url)
+
+    def test_month(self):
+        with self.assertNumQueries(3):
+            data = self.get(f'/api/user/clientListbyMonth/{self.client_obj.id}/2025/1/').json()
+        self.assertEqual((data['start_date'], data['end_date']), ('2025-01-01', '2025-01-31'))
+        days = [(day['date'], day['attended']) for day in data['workout_dates']]
+        self.assertEqual(days[:3], [('2025-01-01', True), ('2025-01-06', False), ('2025-01-08', False)])
+        self.assertEqual(len(days), 9)
+
+    def test_months_span_the_year_end(self):
+        data = self.get(f'/api/user/clientListbyMonth/{self.client_obj.id}/2024/12/?months=3').json()
+        self.assertEqual((data['start_date'], data['end_date']), ('2024-12-01', '2025-02-28'))
+        # Nothing before the workout start date
+        self.assertEqual(data['workout_dates'][0]['date'], '2025-01-01')
+
+    def test_year(self):
+        data = self.get(f'/api/user/clientListbyYear/{self.client_obj.id}/2025/').json()
+        self.assertEqual((data['start_date'], data['end_date']), ('2025-01-01', '2025-12-31'))
+        self.assertEqual(sum(day['attended'] for day in data['workout_dates']), 1)
+
+    def test_out_of_range(self):
+        for url in (
+            f'/api/user/clientListbyYear/{self.client_obj.id}/0/',
+            f'/api/user/clientListbyYear/{self.client_obj.id}/10000/',
+            f'/api/user/clientListbyMonth/{self.client_obj.id}/9999/12/?months=2',
+            f'/api/user/clientListbyMonth/{self.client_obj.id}/2025/13/',
+        ):
+            self.assertEqual(self.get(url).status_code, 400, url)
+
+
+class WeeklyWorkoutSaveTests(HotEndpointData):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.trainer)
+        self.week = WeeklyWorkoutUpdates.objects.get(client=self.client_obj)
+        self.url = f'/api/user/workout/update/{self.client_obj.id}/{self.week.id}'
+
+    def post(self, rows, url=None):
+        return self.api.post(url or self.url, rows, format='json')
+
+    def saved(self):
+        return list(self.week.daily_workouts.order_by('id').values_list('workout_type', 'workout_sets', 'workout_reps'))
+
+    def test_saves_rows_and_next_week(self):
+        response = self.post([
+            {'workout_type': 'Squat', 'sets': 3, 'reps': 10, 'day': 1, 'date': '2025-01-01'},
+            {'workout_type': 'Row', 'sets': '', 'reps': '', 'day': 1, 'date': '2025-01-01'},
+            {'workout_type': '', 'sets': 1},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.saved(), [('Squat', 3, 10), ('Row', 0, 0)])
+        self.week.refresh_from_db()
+        self.assertTrue(self.week.status)
+        self.assertTrue(WeeklyWorkoutUpdates.objects.filter(client=self.client_obj, week_no=self.week.week_no + 1).exists())
+
+    def test_invalid_row_writes_nothing(self):
+        response = self.post([{'workout_type': 'Squat', 'sets': 3}, {'workout_type': 'Row', 'sets': 'many'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.saved(), [])
+        self.week.refresh_from_db()
+        self.assertFalse(self.week.status)
+
+    def test_replace_mode(self):
+        self.post([{'workout_type': 'Squat', 'sets': 3, 'reps': 10}])
+        self.post([{'workout_type': 'Squat', 'sets': 4, 'reps': 8}], url=self.url + '?mode=replace')
+        self.assertEqual(self.saved(), [('Squat', 4, 8)])
+        self.assertEqual(WeeklyWorkoutwithDaysUpdates.objects.filter(client=self.client_obj).count(), 1)
+
+
+class KeysetPaginationTests(HotEndpointData):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.sales)
+
+    def test_full_list_without_page_params(self):
+        self.assertEqual(len(self.api.get('/api/user/leadsList').json()), 5)
+
+    def test_cursor_walks_every_lead_once(self):
+        seen = []
+        url = '/api/user/leadsList?page_size=2'
+        while url:
+            # leads page, then its follow-ups
+            with self.assertNumQueries(2):
+                page = self.api.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [lead['id'] for lead in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(Leads.objects.values_list('id', flat=True)))
+
+    def test_single_page_has_no_next(self):
+        page = self.api.get('/api/user/leadsList?page_size=10').json()
+        self.assertEqual(len(page['results']), 5)
+        self.assertIsNone(page['next'])
+
+
+class StatelessJWTTests(HotEndpointData):
+
+    def setUp(self):
+        cache.clear()
+        tokens = self.client.post('/api/user/token/', {'email': 'trainer@example.com', 'password': 'pw'}).json()
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.refresh = tokens['refresh']
+
+    def test_auth_state_is_cached(self):
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 200)
+        # Only the view's own (empty) lookup, no Token, User or UserRole query
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/user/byrole/0/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 200)
+        self.trainer.is_active = False
+        self.trainer.save()
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 401)
+
+    def test_role_change_needs_a_refreshed_token(self):
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 200)
+        UserRole.objects.create(user=self.trainer, role=Role.objects.get(rolename='sales'))
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 401)
+
+        access = self.client.post('/api/user/token/refresh/', {'refresh': self.refresh}).json()['access']
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.api.get('/api/user/userDetails/').status_code, 200)
+
+    def test_token_user_is_read_only(self):
+        user = StatelessJWTAuthentication().get_user(AccessToken(self.api._credentials['HTTP_AUTHORIZATION'].split()[1]))
+        self.assertEqual(user.email, 'trainer@example.com')
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_user_details_update(self):
+        for url in ('/api/auth/user/', '/api/user/userDetails/'):
+            response = self.api.patch(url, {'name': 'Renamed'}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+        self.trainer.refresh_from_db()
+        self.assertEqual(self.trainer.name, 'Renamed')
+
+    def test_password_change(self):
+        response = self.api.post('/api/auth/password/change/', {'new_password1': 'x7-Quartz-Lamp', 'new_password2': 'x7-Quartz-Lamp'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.trainer.refresh_from_db()
+        self.assertTrue(self.trainer.check_password('x7-Quartz-Lamp'))
+
+
+class BulkAttendanceTests(HotEndpointData):
+
+    def test_upsert_outcomes(self):
+        other = Client.objects.create(name='Other', source='ad', email='other@example.com', phone='1', status='converted', trainer_first_consultation=1)
+        first, second = self.clients[0].id, self.clients[1].id
+        api = APIClient()
+        api.force_authenticate(self.trainer)
+        with CaptureQueriesContext(connection) as queries:
+            response = api.post('/api/user/markClientAttendanceBulk/', [
+                {'client_id': first, 'workout_date': '2025-01-01'},                     # already marked
+                {'client_id': second, 'workout_date': '2025-01-01', 'status': False},   # flips the mark
+                {'client_id': first, 'workout_date': '2025-01-06'},
+                {'client_id': first, 'workout_date': '2025-01-06'},
+                {'client_id': other.id, 'workout_date': '2025-01-06'},
+                {'client_id': first, 'workout_date': 'monday'},
+            ], format='json')
+        data = response.json()
+        self.assertEqual((data['created'], data['updated']), (1, 1))
+        # New and changed marks go in as one upsert
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT') and 'clienattendanceupdates' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([outcome['result'] for outcome in data['results']], [
+            'unchanged', 'updated', 'created', 'duplicate', 'not_in_roster', 'invalid',
+        ])
+        self.assertEqual(
+            set(ClienAttendanceUpdates.objects.filter(client_id__in=[first, second]).values_list('client_id', 'workout_date', 'status')),
+            {(first, date(2025, 1, 1), True), (first, date(2025, 1, 6), True), (second, date(2025, 1, 1), False)},
+        )
+
+
+class AttendanceRollupTests(HotEndpointData):
+
+    def setUp(self):
+        # Two planned weeks of Monday/Wednesday sessions from Wednesday 2025-01-01: the 1st, 6th and 8th
+        WeeklyWorkoutUpdates.objects.filter(client=self.client_obj).delete()
+        create_weeks(build_weeks(self.client_obj.id, self.trainer.id, 1, date(2025, 1, 1), ['Monday', 'Wednesday'], weeks=2))
+        # The fixture's attendance rows were written without refreshing their months
+        rebuild_rollups()
+        self.api = APIClient()
+        self.api.force_authenticate(self.trainer)
+
+    def rollup(self):
+        return AttendanceRollup.objects.filter(client=self.client_obj, year=2025, month=1).values_list(
+            'scheduled_sessions', 'attended_sessions', 'last_attended'
+        ).get()
+
+    def test_planned_weeks_and_marks_refresh_their_month(self):
+        self.assertEqual(self.rollup(), (3, 1, date(2025, 1, 1)))
+        response = self.api.post('/api/user/markClientAttendance/', {'client_id': self.client_obj.id, 'workout_date': '2025-01-06'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.rollup(), (3, 2, date(2025, 1, 6)))
+
+        self.api.post('/api/user/markClientAttendanceBulk/', [
+            {'client_id': self.client_obj.id, 'workout_date': '2025-01-01', 'status': False},
+        ], format='json')
+        self.assertEqual(self.rollup(), (3, 1, date(2025, 1, 6)))
+
+    def test_rebuild_matches_incremental_refresh(self):
+        self.api.post('/api/user/markClientAttendance/', {'client_id': self.client_obj.id, 'workout_date': '2025-01-08'}, format='json')
+        incremental = set(AttendanceRollup.objects.values_list('client_id', 'year', 'month', 'scheduled_sessions', 'attended_sessions', 'last_attended'))
+        rebuild_rollups()
+        self.assertEqual(set(AttendanceRollup.objects.values_list('client_id', 'year', 'month', 'scheduled_sessions', 'attended_sessions', 'last_attended')), incremental)
+
+    def test_failed_refresh_keeps_no_mark(self):
+        with mock.patch.object(views, 'refresh_rollups', side_effect=DatabaseError('rollup write failed')):
+            with self.assertRaises(DatabaseError):
+                self.api.post('/api/user/markClientAttendance/', {'client_id': self.client_obj.id, 'workout_date': '2025-01-06'}, format='json')
+        self.assertFalse(ClienAttendanceUpdates.objects.filter(client=self.client_obj, workout_date=date(2025, 1, 6)).exists())
+
+
+class LeadImportTests(HotEndpointData):
+    # lead0@example.com .. lead4@example.com already exist
+
+    CSV = (
+        'name,source,phone,email,country_code,program_name\n'
+        'Old,ad,1,lead0@example.com,IN,Strength\n'
+        'New,ad,1,new1@example.com,in,Strength\n'
+        'Again,ad,1,New1@example.com,IN,Strength\n'
+        'Broken,ad,1,not-an-email,IN,Strength\n'
+        'Nowhere,ad,1,new2@example.com,XX,Strength\n'
+        'Other,ad,1,new3@example.com,IN,Strength\n'
+    )
+
+    def run_import(self):
+        return import_leads(io.StringIO(self.CSV), self.sales.id, batch_size=2)
+
+    def test_report(self):
+        report = self.run_import()
+        self.assertEqual({key: value for key, value in report.items() if key != 'errors'}, {
+            'rows': 6, 'created': 2, 'duplicates_existing': 1, 'duplicates_in_file': 1, 'invalid': 2,
+        })
+        self.assertEqual([error['line'] for error in report['errors']], [5, 6])
+        new_leads = Leads.objects.filter(email__in=['new1@example.com', 'new3@example.com'])
+        self.assertEqual(LeadsFollowup.objects.filter(lead__in=new_leads).count(), 2)
+
+    def test_email_stored_after_the_check(self):
+        # As if another import inserted lead0 between the lookup and the insert
+        with mock.patch.object(imports, 'existing_emails', return_value=set()):
+            report = self.run_import()
+        self.assertEqual((report['created'], report['duplicates_existing']), (2, 1))
+        self.assertEqual(Leads.objects.filter(email__iexact='lead0@example.com').count(), 1)
+
+    def test_over_long_values_are_invalid_rows(self):
+        report = import_leads(io.StringIO(
+            'name,source,phone,email,country_code,program_name\n'
+            'Formatted,ad,+91 (98765) 43210 ext 9,long1@example.com,IN,Strength\n'
+            'Fine,ad,9876543210,long2@example.com,IN,Strength\n'
+        ), self.sales.id)
+        self.assertEqual((report['created'], report['invalid']), (1, 1))
+        self.assertEqual(report['errors'], [{'line': 2, 'error': 'phone is longer than 15 characters'}])
+        self.assertTrue(Leads.objects.filter(email='long2@example.com').exists())
+
+
+class StaffIdTests(HotEndpointData):
+
+    def staff(self, email, role):
+        return {'name': email, 'phone': '1', 'email': f'{email}@example.com', 'password': 'pw', 'country': 'IN',
+                'role_id': Role.objects.get(rolename=role).id}
+
+    def user_ids(self):
+        return dict(User.objects.exclude(user_id=None).values_list('email', 'user_id'))
+
+    def test_batch_and_single_signups_share_the_sequence(self):
+        response = self.client.post('/api/user/userCreate', [
+            self.staff('t1', 'trainer'), self.staff('s1', 'sales'), self.staff('t2', 'trainer'),
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.client.post('/api/user/userCreate', self.staff('t3', 'trainer'), content_type='application/json')
+        self.assertEqual(self.user_ids(), {
+            't1@example.com': 'FFTR01', 't2@example.com': 'FFTR02', 't3@example.com': 'FFTR03', 's1@example.com': 'FFSL01',
+        })
+        self.assertEqual(UserRole.objects.filter(user__email__in=['t1@example.com', 't2@example.com', 't3@example.com']).count(), 3)
+
+    def test_unknown_role_creates_nobody(self):
+        response = self.client.post('/api/user/userCreate', [
+            self.staff('t1', 'trainer'), {**self.staff('x1', 'trainer'), 'role_id': 999},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.user_ids(), {})
+        self.assertFalse(RoleSequence.objects.filter(last_value__gt=0).exists())
+
+def use_temp_media_root(test):
+    media_root = tempfile.TemporaryDirectory()
+    test.addCleanup(media_root.cleanup)
+    override = test.settings(MEDIA_ROOT=media_root.name)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+class BlobStorageTests(HotEndpointData):
+
+    def setUp(self):
+        use_temp_media_root(self)
+
+    def upload(self, user, content, field='resume'):
+        getattr(user, field).save('cv.PDF', ContentFile(content))
+        return getattr(user, field).name
+
+    def stored_files(self):
+        root = blob_storage.path('blobs')
+        return sorted(os.path.relpath(os.path.join(path, name), root) for path, dirs, names in os.walk(root) for name in names)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(self.trainer, b'same resume')
+        second = self.upload(self.sales, b'same resume')
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^blobs/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        # Only the blob itself is left, the temporary upload was dropped
+        self.assertEqual(self.stored_files(), [os.path.relpath(blob_storage.path(first), blob_storage.path('blobs'))])
+        self.assertEqual(StoredBlob.objects.get(name=first).refcount, 2)
+
+    def test_last_release_deletes_the_file_on_commit(self):
+        shared = self.upload(self.trainer, b'same resume')
+        self.upload(self.sales, b'same resume')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            replacement = self.upload(self.trainer, b'new resume')
+        self.assertTrue(blob_storage.exists(shared))
+        self.assertEqual(StoredBlob.objects.get(name=shared).refcount, 1)
+        self.assertEqual(StoredBlob.objects.get(name=replacement).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.sales.delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(StoredBlob.objects.filter(name=shared).exists())
+        self.assertFalse(blob_storage.exists(shared))
+        self.assertTrue(blob_storage.exists(replacement))
+
+
+class FileServingTests(HotEndpointData):
+    CONTENT = b'0123456789' * 10
+
+    def setUp(self):
+        use_temp_media_root(self)
+        self.trainer.resume.save('cv.pdf', ContentFile(self.CONTENT))
+        self.url = f'/api/user/userFile/{self.trainer.id}/resume/'
+        self.api = APIClient()
+        self.api.force_authenticate(self.trainer)
+
+    def fetch(self, **headers):
+        response = self.api.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_download_carries_validators(self):
+        response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        # Blob ETags are the content digest
+        self.assertIn(response['ETag'].strip('"'), self.trainer.resume.name)
+
+    def test_byte_range(self):
+        response, body = self.fetch(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(body, self.CONTENT[10:20])
+
+    def test_suffix_range(self):
+        response, body = self.fetch(Range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 95-99/{len(self.CONTENT)}')
+        self.assertEqual(body, self.CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        response, body = self.fetch(Range='bytes=500-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_if_none_match_returns_304(self):
+        etag = self.fetch()[0]['ETag']
+        response, body = self.fetch(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_stale_if_range_sends_whole_file(self):
+        etag = self.fetch()[0]['ETag']
+        response, body = self.fetch(Range='bytes=10-19', **{'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+
+        response, body = self.fetch(Range='bytes=10-19', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+
+    def test_other_users_files_are_forbidden(self):
+        api = APIClient()
+        api.force_authenticate(self.sales)
+        self.assertEqual(api.get(self.url).status_code, 403)
+
+
+class MetricsEndpointTests(HotEndpointData):
+
+    def setUp(self):
+        patcher = mock.patch.object(metrics, 'store', metrics.MetricsStore(tempfile.mkdtemp(), flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_denied_without_configured_token(self):
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(APIClient().get('/api/user/metrics').status_code, 403)
+            self.assertEqual(APIClient().get('/api/user/metrics', headers={'Authorization': 'Bearer '}).status_code, 403)
+
+    def test_requires_the_token(self):
+        with self.settings(METRICS_TOKEN='scrape'):
+            self.assertEqual(APIClient().get('/api/user/metrics').status_code, 403)
+            self.assertEqual(APIClient().get('/api/user/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+            response = APIClient().get('/api/user/metrics', headers={'Authorization': 'Bearer scrape'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+
+class ExportTests(HotEndpointData):
+    # Client 0 has three programs and one more client has none
+
+    def setUp(self):
+        program = Program.objects.get()
+        for days in (['Tuesday'], ['Thursday']):
+            ProgramClient.objects.create(client=self.client_obj, program=program, status='active', workout_days=days)
+        Client.objects.create(name='No program', source='ad', email='noprogram@example.com', phone='1', status='converted')
+
+    def test_client_rows_are_not_split_across_batches(self):
+        _, columns = exports.EXPORTS['clients']
+        paths = [path for _, path in columns]
+        program_column = paths.index('programs__id')
+        expected = sorted(Client.objects.values_list('id', 'programs__id'), key=str)
+        self.assertEqual(len(expected), 8)
+        # Every batch size from one that cuts inside client 0's three rows to one past the whole table
+        for chunk_size in range(1, len(expected) + 2):
+            rows = exports.iterate_rows(Client.objects.all(), paths, chunk_size)
+            ids = [(row[0], row[program_column]) for row in rows]
+            self.assertEqual(sorted(ids, key=str), expected, f'chunk_size={chunk_size}')
+
+    def test_csv_download(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw', name='Admin', phone='1', country='IN', is_staff=True)
+        api = APIClient()
+        api.force_authenticate(admin)
+        response = api.get('/api/user/export/clients/csv/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="clients.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'client_id', 'name'])
+        self.assertEqual(len(lines), 1 + 8)
+
+        response = api.get('/api/user/export/leads/ndjson/')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(record['email'] for record in records), [f'lead{index}@example.com' for index in range(5)])
+
+    def test_management_only(self):
+        api = APIClient()
+        api.force_authenticate(self.trainer)
+        self.assertEqual(api.get('/api/user/export/clients/csv/').status_code, 403)
+
+
+class RosterWeeksTests(HotEndpointData):
+    # Every client's only week is week 1, Wednesday 2025-01-01 to Saturday 2025-01-04
+
+    def setUp(self):
+        # Started and booked, but its first week only comes with the second consultation
+        self.unplanned = Client.objects.create(
+            name='Unplanned', source='ad', email='unplanned@example.com', phone='1', status='converted',
+            new_client=False, workout_start_date=date(2025, 1, 1)
+        )
+        ProgramClient.objects.create(client=self.unplanned, program=Program.objects.get(), status='active', trainer=self.trainer, workout_days=['Friday'])
+
+    def generate(self):
+        output = io.StringIO()
+        call_command('generate_workout_weeks', date='2025-01-06', weeks=2, stdout=output)
+        return output.getvalue()
+
+    def test_fills_missing_weeks(self):
+        self.assertIn('Created 15 weeks for 5 clients up to 2025-01-25', self.generate())
+        weeks = WeeklyWorkoutUpdates.objects.filter(client=self.client_obj).order_by('week_no')
+        self.assertEqual(
+            [(week.week_no, week.week_start_date, week.week_end_date) for week in weeks],
+            [(1, date(2025, 1, 1), date(2025, 1, 4)), (2, date(2025, 1, 5), date(2025, 1, 11)),
+             (3, date(2025, 1, 12), date(2025, 1, 18)), (4, date(2025, 1, 19), date(2025, 1, 25))],
+        )
+        self.assertEqual(weeks[1].week_workout_dates, ['2025-01-06', '2025-01-08'])
+        self.assertFalse(WeeklyWorkoutUpdates.objects.filter(client=self.unplanned).exists())
+
+    def test_rerun_creates_nothing(self):
+        self.generate()
+        count = WeeklyWorkoutUpdates.objects.count()
+        self.assertIn('Created 0 weeks for 0 clients', self.generate())
+        self.assertEqual(WeeklyWorkoutUpdates.objects.count(), count)
+
+
+class ReferenceCacheTests(HotEndpointData):
+    # Lists are served from the cache until a save or delete in their group bumps its version
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.trainer)
+
+    def names(self, url, field):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row[field] for row in response.json())
+
+    def assertInvalidated(self, url, field, create, rename, cached_queries=0):
+        before = self.names(url, field)
+        with self.assertNumQueries(cached_queries):
+            self.assertEqual(self.names(url, field), before)
+
+        row = create()
+        self.assertEqual(self.names(url, field), sorted([*before, 'Added']))
+        rename(row)
+        row.save()
+        self.assertEqual(self.names(url, field), sorted([*before, 'Renamed']))
+        row.delete()
+        self.assertEqual(self.names(url, field), before)
+
+    def test_countries(self):
+        self.assertInvalidated(
+            '/api/user/fetchCountry/', 'country_name',
+            lambda: Country.objects.create(country_code='AD', country_name='Added'),
+            lambda country: setattr(country, 'country_name', 'Renamed'),
+        )
+
+    def test_roles(self):
+        self.assertInvalidated(
+            '/api/user/roles/', 'rolename',
+            lambda: Role.objects.create(rolename='Added'),
+            lambda role: setattr(role, 'rolename', 'Renamed'),
+        )
+
+    def test_programs(self):
+        # The ETag's aggregate query still runs on every request
+        self.assertInvalidated(
+            '/api/user/ProgramList', 'name',
+            lambda: Program.objects.create(name='Added', program_type=['personal']),
+            lambda program: setattr(program, 'name', 'Renamed'),
+            cached_queries=1,
+        )
+
+    @skipUnlessDBFeature('supports_json_field_contains')
+    def test_programs_by_type(self):
+        self.assertInvalidated(
+            '/api/user/programListTrainer/personal/', 'name',
+            lambda: Program.objects.create(name='Added', program_type=['personal']),
+            lambda program: setattr(program, 'name', 'Renamed'),
+        )
+
+
+class ConditionalGetTests(HotEndpointData):
+    # The sync views answer a matching If-None-Match/If-Modified-Since with 304 after one aggregate
+
+    def setUp(self):
+        cache.clear()
+        self.week = WeeklyWorkoutUpdates.objects.get(client=self.client_obj)
+        self.day = WeeklyWorkoutwithDaysUpdates.objects.create(
+            client=self.client_obj, trainer_id=self.trainer, weekly_updates_id=self.week, workout_type='Squat'
+        )
+
+    def get(self, view, url, headers=None, **kwargs):
+        request = APIRequestFactory().get(url, headers=headers)
+        force_authenticate(request, self.trainer)
+        response = view.as_view()(request, **kwargs)
+        return response.render() if hasattr(response, 'render') else response
+
+    def etag(self, view, url, **kwargs):
+        response = self.get(view, url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertNotModified(self, view, url, **kwargs):
+        first = self.get(view, url, **kwargs)
+        with self.assertNumQueries(1):
+            response = self.get(view, url, headers={'If-None-Match': first['ETag']}, **kwargs)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        response = self.get(view, url, headers={'If-Modified-Since': first['Last-Modified']}, **kwargs)
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified(self):
+        self.assertNotModified(views.ClientListView, '/api/user/clientList')
+        self.assertNotModified(views.ProgramListView, '/api/user/ProgramList')
+        self.assertNotModified(
+            views.WeeklyWorkoutDetailsView, f'/api/user/weekworkoutDetails/{self.client_obj.id}/', client_id=self.client_obj.id
+        )
+
+    def test_program_edit_changes_etags(self):
+        programs = self.etag(views.ProgramListView, '/api/user/ProgramList')
+        clients = self.etag(views.ClientListView, '/api/user/clientList')
+        program = Program.objects.get()
+        program.name = 'Strength II'
+        program.save()
+        self.assertNotEqual(self.etag(views.ProgramListView, '/api/user/ProgramList'), programs)
+        # The client list shows program names too
+        self.assertNotEqual(self.etag(views.ClientListView, '/api/user/clientList'), clients)
+
+    def test_daily_workout_edit_and_delete_change_etag(self):
+        url = f'/api/user/weekworkoutDetails/{self.client_obj.id}/'
+        etags = [self.etag(views.WeeklyWorkoutDetailsView, url, client_id=self.client_obj.id)]
+        self.day.workout_reps = 12
+        self.day.save()
+        etags.append(self.etag(views.WeeklyWorkoutDetailsView, url, client_id=self.client_obj.id))
+        self.day.delete()
+        etags.append(self.etag(views.WeeklyWorkoutDetailsView, url, client_id=self.client_obj.id))
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_deleted_program_row_changes_etag(self):
+        clients = self.etag(views.ClientListView, '/api/user/clientList')
+        ProgramClient.objects.filter(client=self.clients[1]).delete()
+        self.assertNotEqual(self.etag(views.ClientListView, '/api/user/clientList'), clients)
+
+
+class AsyncReadViewTests(HotEndpointData):
+    # The async views must answer exactly what the sync views do
+
+    async def assertSameResponse(self, user, view, url, **kwargs):
+        token, _ = await Token.objects.aget_or_create(user=user)
+        request = AsyncRequestFactory().get(url, headers={'Authorization': f'Token {token.key}'})
+        response = await view.as_view()(request, **kwargs)
+        expected = await self.sync_get(user, url)
+        self.assertEqual(response.status_code, expected.status_code, response.content)
+        self.assertEqual(json.loads(response.content), expected.json())
+        if expected.has_header('ETag'):
+            self.assertEqual(response['ETag'], expected['ETag'])
+
+    @staticmethod
+    @sync_to_async
+    def sync_get(user, url):
+        api = APIClient()
+        api.force_authenticate(user)
+        return api.get(url)
+
+    async def test_program_list(self):
+        await self.assertSameResponse(self.trainer, async_views.AsyncProgramListView, '/api/user/ProgramList')
+
+    async def test_client_list(self):
+        await self.assertSameResponse(self.trainer, async_views.AsyncClientListView, '/api/user/clientList')
+
+    async def test_client_list_by_date(self):
+        await self.assertSameResponse(
+            self.trainer, async_views.AsyncClientListByDateView, '/api/user/clientListbyDate/2025-01-06/', attendance_date='2025-01-06'
+        )
+
+    async def test_weekly_workout_details(self):
+        await self.assertSameResponse(
+            self.trainer, async_views.AsyncWeeklyWorkoutDetailsView, f'/api/user/weekworkoutDetails/{self.client_obj.id}/', client_id=self.client_obj.id
+        )
+
+    async def test_weekly_workout_details_unknown_client(self):
+        # Both answer 404 rather than failing on the missing client
+        await self.assertSameResponse(
+            self.trainer, async_views.AsyncWeeklyWorkoutDetailsView, '/api/user/weekworkoutDetails/0/', client_id=0
+        )
+        self.assertEqual((await self.sync_get(self.trainer, '/api/user/weekworkoutDetails/0/')).status_code, 404)
+
+    async def test_leads_list(self):
+        await self.assertSameResponse(self.sales, async_views.AsyncLeadsListView, '/api/user/leadsList')
+        await self.assertSameResponse(self.sales, async_views.AsyncLeadsListView, '/api/user/leadsList?page_size=2')
+
+    async def test_requires_login(self):
+        response = await async_views.AsyncLeadsListView.as_view()(AsyncRequestFactory().get('/api/user/leadsList'))
+        self.assertEqual(response.status_code, 401)
+
+
+class InstrumentationMiddlewareTests(HotEndpointData):
+    # SQL accounting and latency histograms must see the queries of sync and async views alike
+
+    def setUp(self):
+        self.store = metrics.MetricsStore(tempfile.mkdtemp(), flush_interval=0)
+        for patcher in (
+            mock.patch.object(middleware, 'SQL_INSTRUMENTATION', True),
+            mock.patch.object(middleware, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0),
+            mock.patch.object(metrics, 'store', self.store),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sync_request(self):
+        request = APIRequestFactory().get('/api/user/leadsList')
+        force_authenticate(request, self.sales)
+        return request, lambda request: views.LeadsListView.as_view()(request).render()
+
+    async def async_request(self):
+        token, _ = await Token.objects.aget_or_create(user=self.sales)
+        return AsyncRequestFactory().get('/api/user/leadsList', headers={'Authorization': f'Token {token.key}'})
+
+    def test_sql_timing_sync(self):
+        request, view = self.sync_request()
+        # leads, then their follow-ups
+        self.assertIn('desc="2 queries"', middleware.SQLInstrumentationMiddleware(view)(request)['Server-Timing'])
+
+    async def test_sql_timing_async(self):
+        request = await self.async_request()
+        response = await middleware.SQLInstrumentationMiddleware(async_views.AsyncLeadsListView.as_view())(request)
+        # token, leads, follow-ups
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    def assertRecorded(self):
+        merged = metrics.collect(self.store.directory)
+        series = merged[('unmatched', 'GET')]
+        self.assertEqual(series['count'], 1)
+        self.assertEqual(sum(series['buckets']), 1)
+        self.assertEqual(dict(series['statuses']), {'200': 1})
+        self.assertGreater(series['db_duration'], 0)
+
+    def test_latency_histogram_sync(self):
+        request, view = self.sync_request()
+        middleware.MetricsMiddleware(view)(request)
+        self.assertRecorded()
+
+    async def test_latency_histogram_async(self):
+        request = await self.async_request()
+        await middleware.MetricsMiddleware(async_views.AsyncLeadsListView.as_view())(request)
+        self.assertRecorded()
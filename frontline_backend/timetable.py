@@ -0,0 +1,72 @@
+from datetime import datetime
+
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p']
+
+
+def parse_time(value):
+    # "10:30", "10:30:00" or "10:30 AM" -> time, None when unreadable
+    if not isinstance(value, str):
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip().upper(), time_format).time()
+        except ValueError:
+            continue
+    return None
+
+
+def read_time_slot(slot):
+    # ["10:30", "11:30"] -> (start, end), None when unreadable or crossing midnight
+    start, end = parse_time(slot[0]), parse_time(slot[1])
+    if start and end and start < end:
+        return start, end
+    return None
+
+
+def raw_time_slots(preferred_time):
+    # The [start, end] pairs of preferred_time as stored, readable or not
+    return [slot for slot in preferred_time or [] if slot and len(slot) == 2]
+
+
+def parse_time_slots(preferred_time):
+    # preferred_time is stored as [["10:30", "11:30"], ...], keeps the readable (start, end) pairs
+    return [interval for interval in map(read_time_slot, raw_time_slots(preferred_time)) if interval]
+
+
+# Availability bitsets: one int per weekday (Monday first), bit n covers minutes [n*15, n*15+15)
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def interval_bits(start, end, inside=False):
+    # Slots touched by [start, end), or with inside=True only the slots fully covered by it
+    start_minutes = start.hour * 60 + start.minute
+    end_minutes = end.hour * 60 + end.minute
+    if inside:
+        first, last = -(-start_minutes // SLOT_MINUTES), end_minutes // SLOT_MINUTES
+    else:
+        first, last = start_minutes // SLOT_MINUTES, -(-end_minutes // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def parse_available_time(available_time):
+    # Accepts ["09:00", "17:00"], [["09:00", "12:00"], ...] or {"start": ..., "end": ...}
+    if isinstance(available_time, dict):
+        available_time = [[available_time.get('start'), available_time.get('end')]]
+    elif available_time and len(available_time) == 2 and all(isinstance(value, str) for value in available_time):
+        available_time = [available_time]
+    return parse_time_slots(available_time)
+
+
+def availability_bitsets(available_days, available_time, weekdays):
+    # available_days may hold full names or short ones ('mon'); no time set means the whole day
+    day_prefixes = {str(day).lower()[:3] for day in available_days or []}
+    time_bits = 0
+    for start, end in parse_available_time(available_time):
+        time_bits |= interval_bits(start, end, inside=True)
+    if not available_time:
+        time_bits = FULL_DAY
+    return [time_bits if day[:3] in day_prefixes else 0 for day in weekdays]
@@ -1,27 +1,42 @@
 from dj_rest_auth.views import LoginView
+from django.conf import settings
 from django.urls import path
-from .views import UserCreateView, RoleListView, UserListView, UsersByRoleView, ProgramCreateView, ProgramListView, CustomUserDetailsView, NewClientListView, ScheduleConsultationView, TrainerConsultationDetails , ConsultationScheduleDetails, ClientListView, ClientDetailsView, WeeklyWorkoutDetailsView, SaveWeeklyWorkoutUpdatesView, ClientListByDateView, MarkClientAttendanceView, ClientListByMonthView, ProgramListwithTypeView, TrainerScheduleView, TrainerAvailabilityView, CountryListView, LeadCreateView, LeadsListView, LeadsView
+from .views import RoleTokenObtainPairView, RoleTokenRefreshView, UserCreateView, RoleListView, UserListView, UsersByRoleView, ProgramCreateView, ProgramListView, ProgramClientCreateView, CustomUserDetailsView, NewClientListView, ScheduleConsultationView, TrainerConsultationDetails , ConsultationScheduleDetails, ClientListView, ClientDetailsView, WeeklyWorkoutDetailsView, SaveWeeklyWorkoutUpdatesView, ClientListByDateView, MarkClientAttendanceView, MarkClientAttendanceBulkView, AttendanceRollupView, ClientListByMonthView, ClientListByYearView, ProgramListwithTypeView, TrainerScheduleView, TrainerConflictsView, TrainerMatchView, TrainerAvailabilityView, CountryListView, LeadCreateView, LeadsListView, LeadsView, LeadImportView, FollowupQueueView, ExportView, UserFileView, MetricsView
+
+if getattr(settings, 'ASYNC_READ_VIEWS', False):
+    # Same URLs and names, served by the async views (under ASGI)
+    from .async_views import (
+        AsyncProgramListView as ProgramListView, AsyncClientListView as ClientListView, AsyncClientListByDateView as ClientListByDateView,
+        AsyncWeeklyWorkoutDetailsView as WeeklyWorkoutDetailsView, AsyncLeadsListView as LeadsListView,
+    )
 
 urlpatterns = [
     path('login', LoginView.as_view(), name='login'),
+    path('token/', RoleTokenObtainPairView.as_view(), name='token-obtain'),
+    path('token/refresh/', RoleTokenRefreshView.as_view(), name='token-refresh'),
 
     path('fetchCountry/', CountryListView.as_view(), name='country-list'),
 
     path('userDetails/', CustomUserDetailsView.as_view(), name='rest_user_details'),
     path('userCreate', UserCreateView.as_view(), name='user-create'),
     path('userList', UserListView.as_view(), name='user-list'),
+    path('userFile/<int:user_id>/<str:field>/', UserFileView.as_view(), name='user-file'),
     path('roles/', RoleListView.as_view(), name='role-list'),
     path('byrole/<int:role_id>/', UsersByRoleView.as_view(), name='user-role'),
 
     path('programCreate', ProgramCreateView.as_view(), name='program-create'),
     path('ProgramList', ProgramListView.as_view(), name='program-list'),
+    path('programClientCreate', ProgramClientCreateView.as_view(), name='program-client-create'),
 
     path('newclientList', NewClientListView.as_view(), name='newclient-list'),
     path('clientList', ClientListView.as_view(), name='client-list'),
     path('clientDetails/<int:client_id>/', ClientDetailsView.as_view(), name='client-details'),
     path('clientListbyDate/<str:attendance_date>/', ClientListByDateView.as_view(), name='client-list-by-date'),
     path('clientListbyMonth/<int:client_id>/<int:year>/<int:month>/', ClientListByMonthView.as_view(), name='client-list-by-month'),
+    path('clientListbyYear/<int:client_id>/<int:year>/', ClientListByYearView.as_view(), name='client-list-by-year'),
     path('markClientAttendance/', MarkClientAttendanceView.as_view(), name='mark-client-attendance'),
+    path('markClientAttendanceBulk/', MarkClientAttendanceBulkView.as_view(), name='mark-client-attendance-bulk'),
+    path('attendanceRollups/', AttendanceRollupView.as_view(), name='attendance-rollups'),
 
     path('weekworkoutDetails/<int:client_id>/', WeeklyWorkoutDetailsView.as_view(), name='weekly-workout-details'),
     path('workout/update/<int:client_id>/<int:week_table_id>', SaveWeeklyWorkoutUpdatesView.as_view(), name='weekly-workout-updates'),
@@ -33,10 +48,17 @@ urlpatterns = [
 
     path('programListTrainer/<str:program_type>/', ProgramListwithTypeView.as_view(), name='program-list-type'),
     path('availabilityTrainer/<int:trainer_id>/', TrainerScheduleView.as_view(), name='availability-trainer'),
+    path('conflictsTrainer/<int:trainer_id>/', TrainerConflictsView.as_view(), name='conflicts-trainer'),
+    path('matchTrainers/', TrainerMatchView.as_view(), name='match-trainers'),
     path('timingTrainer/<int:trainer_id>/', TrainerAvailabilityView.as_view(), name='timing-trainer'),
 
     path('leadCreate', LeadCreateView.as_view(), name='lead-create'),
     path('leadsList', LeadsListView.as_view(), name='lead-list'),
     path('fetchLead/<int:lead_id>', LeadsView.as_view(), name='lead-view'),
+    path('importLeads', LeadImportView.as_view(), name='import-leads'),
+    path('followupQueue', FollowupQueueView.as_view(), name='followup-queue'),
+
+    path('export/<str:dataset>/<str:export_format>/', ExportView.as_view(), name='export'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     
 ]
\ No newline at end of file
@@ -1,42 +1,71 @@
 # users/views.py
 
+import io
 from rest_framework import generics
-from django.db.models import Q, OuterRef, Subquery, Exists
+from django.db import transaction, connection
+from django.db.models import Q, OuterRef, Subquery, Exists, Prefetch
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from .models import User, Role, UserRole, Program, Client, ConsulationSchedules, ProgramClient, WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, ClienAttendanceUpdates, Country, Leads, LeadsFollowup
-from .serializers import UserCreateSerializer, RoleSerializer, UserSerializer, ProgramCreateSerializer, ProgramsSerializer, CustomUserDetailsSerializer, NewClientSerializer, ConsultationScheduleSerializer, TrainerConsultationDataSerializer, ConsultationScheduleWithClientSerializer, ClientSerializer, WeeklyWorkoutSerializer, ProgramClientDaysSerializer, CountrySerializer, LeadCreateSerializer, LeadsSerializer
+from .models import User, Role, Program, Client, ConsulationSchedules, ProgramClient, WeeklyWorkoutUpdates, WeeklyWorkoutwithDaysUpdates, ClienAttendanceUpdates, Country, Leads, LeadsFollowup, TrainerSlot, AttendanceRollup
+from .serializers import UserCreateSerializer, RoleSerializer, UserSerializer, ProgramCreateSerializer, ProgramsSerializer, CustomUserDetailsSerializer, NewClientSerializer, ConsultationScheduleSerializer, TrainerConsultationDataSerializer, ConsultationScheduleWithClientSerializer, ClientSerializer, WeeklyWorkoutSerializer, ProgramClientDaysSerializer, CountrySerializer, LeadCreateSerializer, LeadsSerializer, WeeklyWorkoutDayInputSerializer, ProgramClientBookingSerializer, RoleTokenObtainPairSerializer, RoleTokenRefreshSerializer, AttendanceEntrySerializer
 from dj_rest_auth.views import UserDetailsView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.permissions import IsAuthenticated
-from datetime import datetime, timedelta, date
-import calendar
-from calendar import monthrange
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from django.http import HttpResponse
+from datetime import datetime, timedelta
+from .calendars import build_workout_calendar, month_range
+from .schedules import build_weeks, create_weeks
+from .weekdays import WEEKDAYS, masks_with_day
+from .timetable import parse_time
+from .matching import match_trainers
+from .pagination import list_response
+from .caching import cached_reference
+from .conditional import conditional_response, scope_validators
+from .permissions import IsManagement
+from .exports import EXPORTS, CONTENT_TYPES, export_response
+from .rollups import refresh_rollups, month_keys
+from .imports import import_leads
+from .fileserving import serve_file
+from . import metrics
 
 class CustomUserDetailsView(UserDetailsView):
     serializer_class = CustomUserDetailsSerializer
 
+class RoleTokenObtainPairView(TokenObtainPairView):
+    serializer_class = RoleTokenObtainPairSerializer
+
+class RoleTokenRefreshView(TokenRefreshView):
+    serializer_class = RoleTokenRefreshSerializer
+
 class UserCreateView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserCreateSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        # A JSON list onboards several staff members in one transaction
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
 class RoleListView(APIView):
     def get(self, request):
         roles = Role.objects.filter(status=True)  # optional filter
-        serializer = RoleSerializer(roles, many=True)
-        return Response(serializer.data)
+        data = cached_reference('roles', 'active', lambda: list(RoleSerializer(roles, many=True).data))
+        return Response(data)
     
 class UserListView(APIView):
     def get(self, request):
         # users = User.objects.filter(status=True)
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        users = User.objects.with_roles()
+        return list_response(request, users, UserSerializer)
     
 class UsersByRoleView(APIView):
     def get(self, request, role_id):
-        user_roles = UserRole.objects.filter(role__id=role_id).select_related('user', 'role')
-        users = [user_role.user for user_role in user_roles]
+        users = User.objects.with_roles().filter(userrole__role_id=role_id)
         serializer = UserSerializer(users, many=True)
         return Response(serializer.data)
 
@@ -48,20 +77,35 @@ class ProgramCreateView(APIView):
             return Response({"message": "Program created successfully", "data": serializer.data}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+class ProgramClientCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        with transaction.atomic():
+            serializer = ProgramClientBookingSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            serializer.save()
+        return Response({"message": "Client enrolled successfully", "data": serializer.data}, status=status.HTTP_201_CREATED)
+
 class ProgramListView(APIView):
     def get(self, request):
         # users = User.objects.filter(status=True)
         programs = Program.objects.all()
-        serializer = ProgramsSerializer(programs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return conditional_response(
+            request,
+            scope_validators(request, programs, 'updated_at'),
+            lambda: list_response(request, programs, ProgramsSerializer, cache_group='programs')
+        )
     
 class NewClientListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         user = request.user.id
-        clients = Client.objects.filter(new_client=True, programs__trainer_id = user).distinct()
-        serializer = NewClientSerializer(clients, many=True)
-        return Response(serializer.data)
+        clients = Client.objects.filter(new_client=True, programs__trainer_id = user).distinct().prefetch_related(
+            Prefetch('programs', queryset=ProgramClient.objects.select_related('program'))
+        )
+        return list_response(request, clients, NewClientSerializer)
     
 
 class ScheduleConsultationView(APIView):
@@ -96,45 +140,9 @@ class ScheduleConsultationView(APIView):
 
             if workout_start_date and no_of_consultation == 2:
                 program_client = ProgramClient.objects.filter(client=client, status="active").last()
-                if program_client and program_client.workout_days:
-                    no_of_days = len(program_client.workout_days)
-                else:
-                    no_of_days = 0
-
                 workout_start_date = datetime.strptime(workout_start_date, "%Y-%m-%d").date()
-                start_weekday = workout_start_date.weekday()  # Monday=0, Sunday=6
-                days_until_saturday = (calendar.SATURDAY - start_weekday) % 7
-                week_end_date = workout_start_date + timedelta(days=days_until_saturday)
-
-                week_range = [workout_start_date + timedelta(days=i) for i in range((week_end_date - workout_start_date).days + 1)]
-                current_week_days = [day.strftime('%A').lower() for day in week_range]
-
-                week_no_of_days = 0
-                week_workout_days = []
-                week_workout_dates = []
-                if program_client and program_client.workout_days:
-                    client_days = [day.lower() for day in program_client.workout_days]
-                    # Count how many of client's workout days fall in this week range
-                    # week_no_of_days = sum(1 for day in current_week_days if day in client_days)
-
-                    for date, day_name in zip(week_range, current_week_days):
-                        if day_name in client_days:
-                            week_no_of_days += 1
-                            week_workout_days.append(day_name)
-                            week_workout_dates.append(date.strftime('%Y-%m-%d'))
-
-                WeeklyWorkoutUpdates.objects.create(
-                    client = client,
-                    trainer_id = request.user,
-                    week_no = 1,
-                    no_of_days = no_of_days,
-                    week_no_of_days = week_no_of_days,
-                    week_start_date = workout_start_date,
-                    week_end_date = week_end_date,
-                    week_workout_days = week_workout_days,
-                    week_workout_dates = week_workout_dates,
-                    status = False
-                )
+                workout_days = program_client.workout_days if program_client else []
+                create_weeks(build_weeks(client.id, request.user.id, 1, workout_start_date, workout_days))
 
             # Update latest ConsulationSchedules row's status to True (1)
             previous_consultation = ConsulationSchedules.objects.filter(
@@ -173,11 +181,18 @@ class ConsultationScheduleDetails(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # Other consultations of the same client with the same user, resolved per row in SQL
+        same_pair = ConsulationSchedules.objects.filter(client=OuterRef('client'), user=OuterRef('user'))
         consultations = ConsulationSchedules.objects.filter(
             Q(user=request.user),
             Q(status=False),
             Q(client__trainer_first_consultation=3) | Q(client__trainer_first_consultation=1)
-        ).select_related('client')
+        ).annotate(
+            latest_datetime=Subquery(same_pair.order_by('-datetime').values('datetime')[:1]),
+            previous_user_id=Subquery(same_pair.exclude(id=OuterRef('id')).order_by('-datetime').values('user_id')[:1]),
+        ).select_related('client').prefetch_related(
+            Prefetch('client__programs', queryset=ProgramClient.objects.select_related('program'))
+        )
         serializer = ConsultationScheduleWithClientSerializer(consultations, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -185,9 +200,16 @@ class ClientListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         user = request.user.id
-        clients = Client.objects.filter(new_client=False, programs__trainer_id = user).distinct()
-        serializer =ClientSerializer(clients, many=True)
-        return Response(serializer.data)
+        clients = Client.objects.filter(new_client=False, programs__trainer_id = user).distinct().prefetch_related(
+            Prefetch('programs', queryset=ProgramClient.objects.select_related('program'))
+        )
+        # Everything the response shows: the clients, all their programs and the program names
+        scope = ProgramClient.objects.filter(client__in=Client.objects.filter(new_client=False, programs__trainer_id=user))
+        return conditional_response(
+            request,
+            scope_validators(request, scope, 'updated_at', 'client__updated_at', 'program__updated_at'),
+            lambda: list_response(request, clients, ClientSerializer)
+        )
     
 class ClientDetailsView(APIView):
     def get(self, request, client_id):
@@ -197,10 +219,19 @@ class ClientDetailsView(APIView):
 
 class WeeklyWorkoutDetailsView(APIView):
     def get(self, request, client_id):
-        client = Client.objects.get(id=client_id)
-        weekly_updates = WeeklyWorkoutUpdates.objects.filter(client=client).order_by('-week_no')
-        serializer = WeeklyWorkoutSerializer(weekly_updates, many=True)
-        return Response(serializer.data)
+        weekly_updates = WeeklyWorkoutUpdates.objects.filter(client_id=client_id).order_by('-week_no').prefetch_related('daily_workouts')
+
+        def build_response():
+            if not Client.objects.filter(id=client_id).exists():
+                return Response({'error': 'Client not found'}, status=404)
+            serializer = WeeklyWorkoutSerializer(weekly_updates, many=True)
+            return Response(serializer.data)
+
+        return conditional_response(
+            request,
+            scope_validators(request, weekly_updates, 'updated_at', 'daily_workouts__updated_at', count_fields=('id', 'daily_workouts__id')),
+            build_response
+        )
 
 class SaveWeeklyWorkoutUpdatesView(APIView):
     permission_classes = [IsAuthenticated]
@@ -217,80 +248,45 @@ class SaveWeeklyWorkoutUpdatesView(APIView):
         except (Client.DoesNotExist, User.DoesNotExist, WeeklyWorkoutUpdates.DoesNotExist):
             return Response({'error': 'Invalid client, trainer, or weekly_update ID.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        for item in request.data:
-            workout_type = item.get('workout_type')
-            sets = item.get('sets') or 0
-            reps = item.get('reps') or 0
-            week_no = item.get('week_no') or 1
-            day_no = int(item.get('day') or 1)
-            workout_date = item.get('date')
-
-            if not workout_type:
-                continue
+        serializer = WeeklyWorkoutDayInputSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            WeeklyWorkoutwithDaysUpdates.objects.create(
+        daily_workouts = [
+            WeeklyWorkoutwithDaysUpdates(
                 client=client,
                 trainer_id=trainer,
                 weekly_updates_id=weekly_update,
-                week_no=week_no,
-                day_no=day_no,
-                workout_date=workout_date,
-                workout_type=workout_type,
-                workout_sets=sets,
-                workout_reps=reps
+                week_no=item.get('week_no') or 1,
+                day_no=item.get('day') or 1,
+                workout_date=item.get('date'),
+                workout_type=item['workout_type'],
+                workout_sets=item.get('sets') or 0,
+                workout_reps=item.get('reps') or 0
             )
+            for item in serializer.validated_data
+            if item.get('workout_type')
+        ]
+        # ?mode=replace swaps the week's saved rows for the posted ones instead of appending
+        replace = request.query_params.get('mode') == 'replace'
+
+        with transaction.atomic():
+            if replace:
+                weekly_update.daily_workouts.all().delete()
+            WeeklyWorkoutwithDaysUpdates.objects.bulk_create(daily_workouts)
+
+            weekly_update.status = True
+            weekly_update.save()
+
+            # Step 2: Prepare next week's data, unless generate_workout_weeks already created it
+            next_week_exists = WeeklyWorkoutUpdates.objects.filter(client=client, week_no=weekly_update.week_no + 1).exists()
+            if client.workout_start_date and not next_week_exists:
+                program_client = ProgramClient.objects.filter(client=client, status="active").last()
+                workout_days = program_client.workout_days if program_client else []
 
-        weekly_update.status = True
-        weekly_update.save()
-
-        # Step 2: Prepare next week's data
-        if client.workout_start_date:
-            program_client = ProgramClient.objects.filter(client=client, status="active").last()
-
-            if program_client and program_client.workout_days:
-                client_days = [day.lower() for day in program_client.workout_days]
-                no_of_days = len(client_days)
-            else:
-                no_of_days = 0
-                client_days = []
-
-            # Next week's start date is one day after current week_end_date
-            current_week_end = weekly_update.week_end_date
-            next_week_start = current_week_end + timedelta(days=1)
-
-            # Calculate end of next week (Saturday)
-            start_weekday = next_week_start.weekday()
-            days_until_saturday = (calendar.SATURDAY - start_weekday) % 7
-            next_week_end = next_week_start + timedelta(days=days_until_saturday)
-
-            # Date range for next week
-            next_week_range = [next_week_start + timedelta(days=i) for i in range((next_week_end - next_week_start).days + 1)]
-            next_week_day_names = [d.strftime('%A').lower() for d in next_week_range]
-
-            # Filter workout days
-            week_no_of_days = 0
-            week_workout_days = []
-            week_workout_dates = []
-
-            for date, day_name in zip(next_week_range, next_week_day_names):
-                if day_name in client_days:
-                    week_no_of_days += 1
-                    week_workout_days.append(day_name)
-                    week_workout_dates.append(date.strftime('%Y-%m-%d'))
-
-            # Step 3: Create next WeeklyWorkoutUpdates record
-            WeeklyWorkoutUpdates.objects.create(
-                client=client,
-                trainer_id=request.user,
-                week_no=weekly_update.week_no + 1,
-                no_of_days=no_of_days,
-                week_no_of_days=week_no_of_days,
-                week_start_date=next_week_start,
-                week_end_date=next_week_end,
-                week_workout_days=week_workout_days,
-                week_workout_dates=week_workout_dates,
-                status=False
-            )
+                # Next week's start date is one day after current week_end_date
+                next_week_start = weekly_update.week_end_date + timedelta(days=1)
+                create_weeks(build_weeks(client.id, request.user.id, weekly_update.week_no + 1, next_week_start, workout_days))
 
         return Response({'success': 'Workout updates saved successfully.'}, status=status.HTTP_201_CREATED)
 
@@ -304,7 +300,6 @@ class ClientListByDateView(APIView):
 
         try:
             selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            weekday = selected_date.strftime('%A').lower()  # e.g. 'tuesday'
 
             attendance_subquery = ClienAttendanceUpdates.objects.filter(
                 client=OuterRef('client'),
@@ -320,7 +315,7 @@ class ClientListByDateView(APIView):
             program_clients = ProgramClient.objects.filter(
                 status='active',
                 client__workout_start_date__lte=selected_date,
-                workout_days__icontains=weekday,
+                workout_days_mask__in=masks_with_day(selected_date),
                 trainer=request.user
             ).annotate(
                 has_attendance=Exists(attendance_subquery)
@@ -344,71 +339,169 @@ class MarkClientAttendanceView(APIView):
             client = Client.objects.get(id=client_id)
             workout_date_obj = datetime.strptime(workout_date, '%Y-%m-%d').date()
 
-            attendance_exists = ClienAttendanceUpdates.objects.filter(
-                client=client,
-                workout_date=workout_date_obj
-            ).exists()
+            # The (client, workout_date) unique constraint makes this safe against double taps.
+            # The mark and its month's rollup are saved together or not at all.
+            with transaction.atomic():
+                attendance, created = ClienAttendanceUpdates.objects.get_or_create(
+                    client=client,
+                    workout_date=workout_date_obj,
+                    defaults={'trainer_id': request.user}
+                )
+                if created:
+                    refresh_rollups(month_keys(client.id, [workout_date_obj]))
 
-            if attendance_exists:
+            if not created:
                 return Response({"message": "Attendance already marked"}, status=200)
-            ClienAttendanceUpdates.objects.create(
-                client=client,
-                trainer_id=request.user,
-                workout_date=workout_date_obj
-            )
             return Response({"message": "Attendance marked successfully"}, status=201)
         except Client.DoesNotExist:
             return Response({"error": "Client not found"}, status=404)
 
+class MarkClientAttendanceBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Body: [{"client_id": 1, "workout_date": "2025-06-02", "status": true}, ...]
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of attendance entries"}, status=400)
+
+        outcomes = [None] * len(request.data)
+        entries = {}
+        for index, item in enumerate(request.data):
+            serializer = AttendanceEntrySerializer(data=item)
+            if not serializer.is_valid():
+                outcomes[index] = {'result': 'invalid', 'errors': serializer.errors}
+                continue
+            entry = serializer.validated_data
+            key = (entry['client_id'], entry['workout_date'])
+            if key in entries:
+                outcomes[index] = {'result': 'duplicate'}
+                continue
+            entries[key] = (index, entry['status'])
+
+        client_ids = {client_id for client_id, _ in entries}
+        roster = set(ProgramClient.objects.filter(
+            trainer_id=request.user.id, status='active', client_id__in=client_ids
+        ).values_list('client_id', flat=True))
+        existing = {
+            (client_id, workout_date): attendance_status
+            for client_id, workout_date, attendance_status in ClienAttendanceUpdates.objects.filter(
+                client_id__in=roster, workout_date__in={workout_date for _, workout_date in entries}
+            ).values_list('client_id', 'workout_date', 'status')
+        }
+
+        rows = []
+        for (client_id, workout_date), (index, attendance_status) in entries.items():
+            if client_id not in roster:
+                result = 'not_in_roster'
+            elif (client_id, workout_date) not in existing:
+                result = 'created'
+            elif existing[(client_id, workout_date)] != attendance_status:
+                result = 'updated'
+            else:
+                result = 'unchanged'
+            outcomes[index] = {'result': result}
+            if result in ('created', 'updated'):
+                rows.append(ClienAttendanceUpdates(
+                    client_id=client_id, trainer_id_id=request.user.id, workout_date=workout_date, status=attendance_status
+                ))
+
+        # One upsert for every new or changed mark, a concurrent insert of the same day just updates it
+        if rows:
+            with transaction.atomic():
+                ClienAttendanceUpdates.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['client', 'workout_date'] if connection.features.supports_update_conflicts_with_target else None,
+                    update_fields=['status', 'trainer_id', 'updated_at'],
+                )
+                refresh_rollups({key for row in rows for key in month_keys(row.client_id, [row.workout_date])})
+
+        for outcome, item in zip(outcomes, request.data):
+            if isinstance(item, dict):
+                outcome.update(client_id=item.get('client_id'), workout_date=item.get('workout_date'))
+        return Response({
+            'created': sum(outcome['result'] == 'created' for outcome in outcomes),
+            'updated': sum(outcome['result'] == 'updated' for outcome in outcomes),
+            'results': outcomes,
+        }, status=status.HTTP_200_OK)
+
+class AttendanceRollupView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?client=<id> for one client, otherwise the logged-in trainer's clients; optional &year=
+        rollups = AttendanceRollup.objects.select_related('client').order_by('year', 'month', 'client_id')
+        client_id = request.query_params.get('client')
+        year = request.query_params.get('year')
+        try:
+            if client_id:
+                rollups = rollups.filter(client_id=int(client_id))
+            else:
+                rollups = rollups.filter(trainer_id=request.user.id)
+            if year:
+                rollups = rollups.filter(year=int(year))
+        except ValueError:
+            return Response({'error': 'client and year must be numbers'}, status=400)
+
+        return Response([{
+            'client_id': rollup.client_id,
+            'client_name': rollup.client.name,
+            'trainer_id': rollup.trainer_id,
+            'year': rollup.year,
+            'month': rollup.month,
+            'scheduled_sessions': rollup.scheduled_sessions,
+            'attended_sessions': rollup.attended_sessions,
+            'attendance_percentage': round(100 * rollup.attended_sessions / rollup.scheduled_sessions, 1) if rollup.scheduled_sessions else None,
+            'last_attended': rollup.last_attended,
+        } for rollup in rollups])
+
 class ClientListByMonthView(APIView):
     def get(self, request, client_id, year, month):
+        # Optional ?months=N loads N consecutive months (max 12) in one request
         try:
-            client = Client.objects.get(id=client_id)
-        except Client.DoesNotExist:
-            return Response({'error': 'Client not found'}, status=404)
-        workout_start_date = client.workout_start_date
-        if not workout_start_date:
-            return Response({'error': 'Client has no workout_start_date'}, status=400)
-
-        # Get active program
-        program_client = ProgramClient.objects.filter(client=client, status="active").last()
-        if not program_client:
-            return Response({'error': 'No active program found'}, status=404)
-
-        workout_days = program_client.workout_days or []
-        # Normalize to lowercase
-        workout_days = [day.lower() for day in workout_days]
-
-        num_days = monthrange(int(year), int(month))[1]
-        workout_dates = []
-
-        for day in range(1, num_days + 1):
-            current_date = date(int(year), int(month), day)
-            if current_date >= workout_start_date:
-                if current_date.strftime('%A').lower() in workout_days:
-                    # Check if attendance is marked
-                    attendance = ClienAttendanceUpdates.objects.filter(client=client, workout_date=current_date).first()
-                    
-                    workout_dates.append({
-                        'date': current_date,
-                        'attended': bool(attendance),
-                        'attendance_data': {
-                            'id': attendance.id,
-                            'trainer_id': attendance.trainer_id.id,
-                            'status': attendance.status,
-                            'created_at': attendance.created_at,
-                        } if attendance else None
-                    })
-        
-        return Response({
-            'program': {
-                'id': program_client.program.id,
-                'name': program_client.program.name,
-                'type': program_client.program_type,
-                'preferred_time': program_client.preferred_time,
-            },
-            'workout_dates': workout_dates
-        })
+            months = int(request.query_params.get('months', 1))
+        except ValueError:
+            return Response({'error': 'Invalid months value'}, status=400)
+        if not 1 <= months <= 12 or not 1 <= month <= 12:
+            return Response({'error': 'Invalid month range'}, status=400)
+        try:
+            start_date, end_date = month_range(year, month, months)
+        except ValueError:  # outside the years date() supports
+            return Response({'error': 'Invalid month range'}, status=400)
+        return workout_calendar_response(client_id, start_date, end_date)
+
+class ClientListByYearView(APIView):
+    def get(self, request, client_id, year):
+        try:
+            start_date, end_date = month_range(year, 1, 12)
+        except ValueError:
+            return Response({'error': 'Invalid year'}, status=400)
+        return workout_calendar_response(client_id, start_date, end_date)
+
+def workout_calendar_response(client_id, start_date, end_date):
+    try:
+        client = Client.objects.get(id=client_id)
+    except Client.DoesNotExist:
+        return Response({'error': 'Client not found'}, status=404)
+    if not client.workout_start_date:
+        return Response({'error': 'Client has no workout_start_date'}, status=400)
+
+    # Get active program
+    program_client = ProgramClient.objects.filter(client=client, status="active").select_related('program').last()
+    if not program_client:
+        return Response({'error': 'No active program found'}, status=404)
+
+    return Response({
+        'program': {
+            'id': program_client.program.id,
+            'name': program_client.program.name,
+            'type': program_client.program_type,
+            'preferred_time': program_client.preferred_time,
+        },
+        'start_date': start_date,
+        'end_date': end_date,
+        'workout_dates': build_workout_calendar(client, program_client, start_date, end_date)
+    })
     
 class ProgramListwithTypeView(APIView):
     def get(self, request, program_type):
@@ -417,8 +510,8 @@ class ProgramListwithTypeView(APIView):
         else:
             programs = Program.objects.all()
 
-        serializer = ProgramsSerializer(programs, many=True)
-        return Response(serializer.data)
+        data = cached_reference('programs', f'type:{program_type}', lambda: list(ProgramsSerializer(programs, many=True).data))
+        return Response(data)
 
 class TrainerAvailabilityView(APIView):
     def get(self, request, trainer_id):
@@ -433,7 +526,10 @@ class TrainerAvailabilityView(APIView):
     
 class TrainerScheduleView(APIView):
     def get(self, request, trainer_id):
-        program_clients = ProgramClient.objects.filter(trainer_id=trainer_id, status="active")
+        # Read from the materialized timetable kept in sync by ProgramClient saves
+        slots = TrainerSlot.objects.filter(trainer_id=trainer_id).order_by('program_client_id', 'id').values_list(
+            'day', 'start_text', 'end_text', 'start_time', 'program_name'
+        )
         # Initialize empty schedule
         schedule = {
             'sunday': [],
@@ -444,28 +540,62 @@ class TrainerScheduleView(APIView):
             'friday': [],
             'saturday': []
         }
-        for pc in program_clients:
-            days = pc.workout_days or []         # e.g., ['monday', 'wednesday']
-            time_slots = pc.preferred_time or [] # e.g., [["10:30", "11:30"]]
-            program_name = pc.program.name if pc.program else "Program"
-
-            for day in days:
-                for slot in time_slots:
-                    if slot and len(slot) == 2:
-                        schedule[day.lower()].append({
-                            "start": slot[0],
-                            "end": slot[1],
-                            "program": program_name
-                        })
+        for day, start, end, start_time, program_name in slots:
+            entry = {
+                "start": start,
+                "end": end,
+                "program": program_name
+            }
+            if start_time is None:
+                # Shown as entered, but these times are left out of conflict checks and matching
+                entry["error"] = "Time slot crosses midnight" if parse_time(start) and parse_time(end) else "Unreadable time slot"
+            schedule[WEEKDAYS[day]].append(entry)
 
         return Response(schedule)
+
+class TrainerConflictsView(APIView):
+    def get(self, request, trainer_id):
+        # e.g. ?days=monday,wednesday&start=10:30&end=11:30
+        days = [day.strip().lower() for day in request.query_params.get('days', '').split(',') if day.strip()]
+        start_time = parse_time(request.query_params.get('start'))
+        end_time = parse_time(request.query_params.get('end'))
+        if not days or any(day not in WEEKDAYS for day in days):
+            return Response({'error': 'Invalid days'}, status=400)
+        if not start_time or not end_time or start_time >= end_time:
+            return Response({'error': 'Invalid start/end time'}, status=400)
+
+        slots = TrainerSlot.objects.overlapping(
+            trainer_id, [WEEKDAYS.index(day) for day in days], [(start_time, end_time)]
+        ).select_related('client').order_by('day', 'start_time')
+        conflicts = [{
+            'day': WEEKDAYS[slot.day],
+            'start': slot.start_time.strftime('%H:%M'),
+            'end': slot.end_time.strftime('%H:%M'),
+            'program': slot.program_name,
+            'client': slot.client.name,
+        } for slot in slots]
+        return Response({'available': not conflicts, 'conflicts': conflicts})
+    
+class TrainerMatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # e.g. ?days=monday,wednesday&start=10:30&end=11:30
+        days = [day.strip().lower() for day in request.query_params.get('days', '').split(',') if day.strip()]
+        start_time = parse_time(request.query_params.get('start'))
+        end_time = parse_time(request.query_params.get('end'))
+        if not days or any(day not in WEEKDAYS for day in days):
+            return Response({'error': 'Invalid days'}, status=400)
+        if not start_time or not end_time or start_time >= end_time:
+            return Response({'error': 'Invalid start/end time'}, status=400)
+
+        return Response(match_trainers([WEEKDAYS.index(day) for day in days], start_time, end_time))
     
 class CountryListView(APIView):
     def get(self, request):
         # users = User.objects.filter(status=True)
         countries = Country.objects.all()
-        serializer = CountrySerializer(countries, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return list_response(request, countries, CountrySerializer, cache_group='countries')
     
 class LeadCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -490,15 +620,28 @@ class LeadCreateView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LeadImportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Multipart CSV upload under `file`, imported leads are assigned to the uploading sales user
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = import_leads(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''), request.user.id)
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
 class LeadsListView(APIView):
     
     permission_classes = [IsAuthenticated]
     def get(self, request):
         # users = User.objects.filter(status=True)
         user = request.user.id
-        leads = Leads.objects.filter(sales_id = user).distinct()
-        serializer = LeadsSerializer(leads, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        leads = Leads.objects.filter(sales_id = user).select_related('country').prefetch_related('leadsfollowup_set')
+        return list_response(request, leads, LeadsSerializer)
 
 class LeadsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -513,4 +656,85 @@ class LeadsView(APIView):
     
 
 
-        
\ No newline at end of file
+        
+
+class ExportView(APIView):
+    permission_classes = [IsManagement]
+
+    def get(self, request, dataset, export_format):
+        if dataset not in EXPORTS:
+            return Response({'error': 'Unknown export'}, status=404)
+        if export_format not in CONTENT_TYPES:
+            return Response({'error': 'Format must be csv or ndjson'}, status=400)
+        return export_response(dataset, export_format)
+
+class FollowupQueueView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Open follow-ups of the logged-in sales user: overdue, due today and the next ?days=N (default 7)
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'error': 'Invalid days value'}, status=400)
+        if not 0 <= days <= 90:
+            return Response({'error': 'days must be between 0 and 90'}, status=400)
+
+        today = timezone.localdate()
+        # One range scan on (sales, status, follow_up_date), lead summary fields joined in
+        followups = LeadsFollowup.objects.filter(
+            sales_id=request.user.id, status=False, follow_up_date__lte=today + timedelta(days=days)
+        ).order_by('follow_up_date', 'id').values(
+            'id', 'follow_up_date', 'lead_id', 'lead__name', 'lead__phone', 'lead__email',
+            'lead__status', 'lead__program_name', 'lead__source',
+        )
+
+        queue = {'overdue': [], 'today': [], 'upcoming': []}
+        for followup in followups:
+            due = followup['follow_up_date']
+            bucket = 'overdue' if due < today else 'today' if due == today else 'upcoming'
+            queue[bucket].append({
+                'followup_id': followup['id'],
+                'follow_up_date': due,
+                'lead': {
+                    'id': followup['lead_id'],
+                    'name': followup['lead__name'],
+                    'phone': followup['lead__phone'],
+                    'email': followup['lead__email'],
+                    'status': followup['lead__status'],
+                    'program_name': followup['lead__program_name'],
+                    'source': followup['lead__source'],
+                },
+            })
+        return Response(queue)
+
+class UserFileView(APIView):
+    permission_classes = [IsAuthenticated]
+    FIELDS = ('resume', 'contract')
+
+    def get(self, request, user_id, field):
+        # Staff can fetch their own files, management anyone's
+        if field not in self.FIELDS:
+            return Response({'error': 'Unknown file'}, status=404)
+        if request.user.id != user_id and not IsManagement().has_permission(request, self):
+            return Response({'error': 'Not allowed'}, status=403)
+        name = User.objects.filter(id=user_id).values_list(field, flat=True).first()
+        if not name:
+            return Response({'error': 'File not found'}, status=404)
+        return serve_file(request, name)
+
+class MetricsView(APIView):
+    # Prometheus scrape target, only served to Authorization: Bearer <METRICS_TOKEN>
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        if metrics.store is None:
+            return Response({'error': 'Metrics are disabled, set METRICS_DIR'}, status=404)
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if not token:
+            return Response({'error': 'Metrics need METRICS_TOKEN to be set'}, status=403)
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response({'error': 'Not allowed'}, status=403)
+        metrics.store.flush()
+        return HttpResponse(metrics.render(metrics.collect(metrics.store.directory)), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,25 @@
+# Weekday bitmasks, bit n is set when WEEKDAYS[n] is included (Monday=0 ... Sunday=6, like date.weekday())
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+ALL_MASKS = range(1 << len(WEEKDAYS))
+
+
+def weekday_mask(days):
+    mask = 0
+    for day in days or []:
+        day = str(day).lower()
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+
+def weekday_bit(day):
+    # day is a date or a weekday name
+    if isinstance(day, str):
+        return 1 << WEEKDAYS.index(day.lower())
+    return 1 << day.weekday()
+
+
+def masks_with_day(day):
+    # Every mask value containing the day, so "trains on day" is an indexed IN lookup on the mask column
+    bit = weekday_bit(day)
+    return [mask for mask in ALL_MASKS if mask & bit]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'dj_rest_auth',
     'frontline_backend',
     'corsheaders'
@@ -47,7 +49,17 @@ REST_AUTH_SERIALIZERS = {
     'USER_DETAILS_SERIALIZER': 'frontline_backend.serializers.CustomUserDetailsSerializer'
 }
 
+# dj_rest_auth (api/auth/) reads REST_AUTH. Its write endpoints must save the stored user, not the
+# read-only one StatelessJWTAuthentication builds from Bearer token claims.
+REST_AUTH = {
+    'USER_DETAILS_SERIALIZER': 'frontline_backend.serializers.StoredUserDetailsSerializer',
+    'PASSWORD_CHANGE_SERIALIZER': 'frontline_backend.serializers.StoredUserPasswordChangeSerializer',
+}
+
 MIDDLEWARE = [
+    # Outermost, so session and authentication queries are counted too
+    'frontline_backend.middleware.SQLInstrumentationMiddleware',
+    'frontline_backend.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -128,6 +140,25 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process, so other workers see reference data changes once REFERENCE_CACHE_TIMEOUT
+# expires. Point this at Redis/Memcached to share invalidations across workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'frontline-fitness',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    }
+}
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -143,7 +174,11 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
 }
+# Seconds a user's is_active flag and roles are cached for bearer token checks
+AUTH_STATE_TIMEOUT = 60
 CORS_ALLOW_ALL_ORIGINS = True
 # CORS_ALLOWED_ORIGINS = [
 #     "http://127.0.0.1:8000/",  # or whatever your Vite/webpack dev server is
@@ -155,6 +190,9 @@ APPEND_SLASH=False
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # "Bearer <jwt>" from api/user/token/ is checked without a database lookup,
+        # "Token <key>" from the dj_rest_auth login keeps working for older app builds
+        'frontline_backend.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ),
 }
@@ -163,3 +201,35 @@ from django.conf import settings
 print("💬 REST_AUTH_SERIALIZERS in use:", getattr(settings, 'REST_AUTH_SERIALIZERS', 'Not Set'))
 
 
+
+# Staff file serving (resumes/contracts)
+# None streams through Django, 'sendfile' sets X-Sendfile, 'accel' sets X-Accel-Redirect under
+# FILE_ACCEL_PREFIX, which nginx must map as an internal location onto MEDIA_ROOT.
+
+FILE_SERVING_MODE = None
+FILE_ACCEL_PREFIX = '/protected/'
+FILE_CHUNK_SIZE = 64 * 1024
+
+# SQL instrumentation (frontline_backend.middleware.SQLInstrumentationMiddleware)
+# Off unless SQL_INSTRUMENTATION is set. Sampled requests get a Server-Timing header with their
+# query count and SQL time, statements repeated more than SQL_REPEAT_THRESHOLD times are logged
+# as warnings on the 'frontline_backend.sql' logger.
+
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION') == '1'
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', '0.05'))
+SQL_REPEAT_THRESHOLD = 10
+
+# Request metrics (frontline_backend.middleware.MetricsMiddleware, served at api/user/metrics)
+# Off unless METRICS_DIR is set. Every worker process writes its totals there and the endpoint
+# sums them, so use a local directory shared by the workers and empty it on each deploy/restart.
+# Scrapers send Authorization: Bearer <METRICS_TOKEN>, without a token the endpoint answers 403.
+
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Async read views (frontline_backend.async_views) for ProgramList, clientList, clientListbyDate,
+# weekworkoutDetails and leadsList. Only worth turning on when serving frontline_fitness.asgi,
+# under WSGI every async view runs in its own event loop.
+
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
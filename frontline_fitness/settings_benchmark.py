@@ -0,0 +1,25 @@
+"""
+Settings for `manage.py benchmark_endpoints`: the project settings on a throwaway SQLite
+database, so seeded benchmark data never reaches the MySQL server.
+
+    python manage.py benchmark_endpoints --settings=frontline_fitness.settings_benchmark --scale 0.1
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', BASE_DIR / 'benchmark.sqlite3'),
+    }
+}
+
+MEDIA_ROOT = BASE_DIR / 'benchmark-media'
+# Metrics on, as in production, so the metrics route is timed too
+METRICS_DIR = BASE_DIR / 'benchmark-metrics'
+METRICS_TOKEN = 'benchmark'
+ALLOWED_HOSTS = ['testserver', 'localhost']
+DEBUG = False